@@ -8,7 +8,7 @@ from mt.halo import HaloAuto
 
 from .csv import read_csv_asyn, to_csv_asyn
 from .dftype import get_dftype
-from .pdh5 import load_pdh5_asyn, save_pdh5, Pdh5Cell
+from .pdh5 import load_pdh5_asyn, save_pdh5_asyn, Pdh5Cell
 
 
 __all__ = [
@@ -164,6 +164,7 @@ async def dfload_asyn(
     file_read_delayed: bool = False,
     max_rows: tp.Optional[int] = None,
     nrows: tp.Optional[int] = None,
+    columns: tp.Optional[tp.List[str]] = None,
     context_vars: dict = {},
     **kwargs
 ) -> pd.DataFrame:
@@ -189,16 +190,19 @@ async def dfload_asyn(
     nrows : int, optional
         limit the maximum number of rows to read. Only valid for '.csv', '.pdh5' and '.parquet'
         formats.
+    columns : list, optional
+        list of columns to read. For '.pdh5' format, only the requested columns are opened and
+        decoded. For other formats, it is passed as a keyword argument to the corresponding reader.
     context_vars : dict
         a dictionary of context variables within which the function runs. It must include
         `context_vars['async']` to tell whether to invoke the function asynchronously or not.
-        Ignored for '.pdh5' format.
+        For '.pdh5' format, it is only used when the file is read into a buffer.
     *args : tuple
         list of positional arguments to pass to the corresponding reader. Ignored for '.pdh5'
         format.
     **kwargs : dict
-        dictionary of keyword arguments to pass to the corresponding reader. Ignored for '.pdh5'
-        format.
+        dictionary of keyword arguments to pass to the corresponding reader. For '.pdh5' format,
+        they are passed to :func:`mt.pandas.pdh5.load_pdh5_asyn`, e.g. `rows` or `filters`.
 
     Returns
     -------
@@ -229,10 +233,14 @@ async def dfload_asyn(
             show_progress=show_progress,
             file_read_delayed=file_read_delayed,
             max_rows=nrows,
+            columns=columns,
             context_vars=context_vars,
             **kwargs
         )
 
+    if columns is not None:
+        kwargs["columns"] = columns
+
     if filepath.endswith(".parquet"):
         if show_progress:
             spinner = HaloAuto("dfloading '{}'".format(filepath), spinner="dots")
@@ -311,6 +319,7 @@ def dfload(
     file_read_delayed: bool = False,
     max_rows: tp.Optional[int] = None,
     nrows: tp.Optional[int] = None,
+    columns: tp.Optional[tp.List[str]] = None,
     **kwargs
 ) -> pd.DataFrame:
     """Loads a dataframe file based on the file's extension.
@@ -335,12 +344,15 @@ def dfload(
     nrows : int, optional
         limit the maximum number of rows to read. Only valid for '.csv', '.pdh5' and '.parquet'
         formats.
+    columns : list, optional
+        list of columns to read. For '.pdh5' format, only the requested columns are opened and
+        decoded. For other formats, it is passed as a keyword argument to the corresponding reader.
     *args : tuple
         list of positional arguments to pass to the corresponding reader. Ignored for '.pdh5'
         format.
     **kwargs : dict
-        dictionary of keyword arguments to pass to the corresponding reader. Ignored for '.pdh5'
-        format.
+        dictionary of keyword arguments to pass to the corresponding reader. For '.pdh5' format,
+        they are passed to :func:`mt.pandas.pdh5.load_pdh5_asyn`, e.g. `rows` or `filters`.
 
     Returns
     -------
@@ -367,6 +379,7 @@ def dfload(
         file_read_delayed=file_read_delayed,
         max_rows=max_rows,
         nrows=nrows,
+        columns=columns,
         **kwargs
     )
 
@@ -400,27 +413,27 @@ async def dfsave_asyn(
     context_vars : dict
         a dictionary of context variables within which the function runs. It must include
         `context_vars['async']` to tell whether to invoke the function asynchronously or not.
-        Ignored for '.pdh5' format.
     file_write_delayed : bool
         Only valid in asynchronous mode. If True, wraps the file write task into a future and
-        returns the future. In all other cases, proceeds as usual. Ignored for '.pdh5' format.
+        returns the future. In all other cases, proceeds as usual.
     make_dirs : bool
         Whether or not to make the folders containing the path before writing to the file.
     **kwargs : dict
-        dictionary of keyword arguments to pass to the corresponding writer. Ignored for '.pdh5'
-        format.
+        dictionary of keyword arguments to pass to the corresponding writer. For '.pdh5' format,
+        they are passed to :func:`mt.pandas.pdh5.save_pdh5_asyn`, e.g. `compression` or
+        `n_threads`.
 
     Returns
     -------
     asyncio.Future or int
         either a future or the number of bytes written, depending on whether the file write
-        task is delayed or not. For '.pdh5' format, 1 is returned.
+        task is delayed or not
 
     Notes
     -----
     For '.csv' or '.csv.zip' files, we use :func:`mt.pandas.csv.to_csv`. For '.parquet' files, we
     use :func:`pandas.DataFrame.to_parquet`. For '.pdh5' files, we use
-    :func:`mt.pandas.pdh5.save_pdh5`.
+    :func:`mt.pandas.pdh5.save_pdh5_asyn`.
 
     When you want to save a large parquet file, you may want to pass `row_group_size` as a keyword
     argument for pyarrow or `row_group_offsets` as a keyword argument for fastparquet. This would
@@ -440,10 +453,16 @@ async def dfsave_asyn(
     filepath = df_filepath.lower()
 
     if filepath.endswith(".pdh5"):
-        save_pdh5(
-            df_filepath, df, file_mode=file_mode, show_progress=show_progress, **kwargs
+        return await save_pdh5_asyn(
+            df_filepath,
+            df,
+            file_mode=file_mode,
+            show_progress=show_progress,
+            context_vars=context_vars,
+            file_write_delayed=file_write_delayed,
+            make_dirs=make_dirs,
+            **kwargs
         )
-        return 1
 
     if filepath.endswith(".parquet"):
         if show_progress:
@@ -523,7 +542,8 @@ def dfsave(
     make_dirs : bool
         Whether or not to make the folders containing the path before writing to the file.
     **kwargs : dict
-        dictionary of keyword arguments to pass to the corresponding writer
+        dictionary of keyword arguments to pass to the corresponding writer. For '.pdh5' format,
+        they are passed to :func:`mt.pandas.pdh5.save_pdh5`, e.g. `compression` or `n_threads`.
 
     Returns
     -------
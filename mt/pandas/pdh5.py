@@ -1,10 +1,16 @@
 """Loading and saving to column-based pdh5 format."""
 
-import warnings
 import os
+import re
+import sys
 import json
+import mmap
+import contextlib
+import threading
 import pandas as pd
+from collections import OrderedDict, deque
 from io import BytesIO
+from concurrent.futures import Executor, ThreadPoolExecutor
 
 from mt import tp, np, cv, ctx, path, aio
 from mt.base.str import text_filename
@@ -12,7 +18,987 @@ from mt.halo import HaloAuto
 from .dftype import isnull, get_dftype
 
 
-__all__ = ["save_pdh5", "load_pdh5_asyn", "Pdh5Cell"]
+__all__ = [
+    "save_pdh5",
+    "save_pdh5_asyn",
+    "append_pdh5",
+    "Pdh5Writer",
+    "load_pdh5_asyn",
+    "iter_pdh5",
+    "iter_pdh5_asyn",
+    "Pdh5Frame",
+    "open_pdh5",
+    "verify_pdh5",
+    "Pdh5Cell",
+    "load_pdh5_cells",
+    "Pdh5FilePool",
+    "pdh5_file_pool",
+    "Pdh5CellCache",
+    "pdh5_cell_cache",
+]
+
+
+def import_hdf5plugin():
+    """Imports :mod:`hdf5plugin` if it is available, registering its HDF5 filters.
+
+    Returns
+    -------
+    module or None
+        the imported module, or None if it is not importable
+    """
+    try:
+        import hdf5plugin
+
+        return hdf5plugin
+    except ImportError:
+        return None
+
+
+def import_xxhash():
+    """Imports :mod:`xxhash` if it is available.
+
+    Returns
+    -------
+    module or None
+        the imported module, or None if it is not importable
+    """
+    try:
+        import xxhash
+
+        return xxhash
+    except ImportError:
+        return None
+
+
+def import_orjson():
+    """Imports :mod:`orjson` if it is available.
+
+    Returns
+    -------
+    module or None
+        the imported module, or None if it is not importable
+    """
+    try:
+        import orjson
+
+        return orjson
+    except ImportError:
+        return None
+
+
+def compression_kwargs(compression="gzip", dtype=None) -> dict:
+    """Returns the keyword arguments for :func:`h5py.Group.create_dataset` to compress a dataset.
+
+    Parameters
+    ----------
+    compression : str or int or None
+        The compression codec. None or 'none' means no compression. 'gzip' means gzip with the
+        default level. An integer from 0 to 9 means gzip with that level. 'lzf' means LZF. 'zstd',
+        'blosc', 'blosc:lz4' and 'blosc:zstd' mean the corresponding filters of package
+        :mod:`hdf5plugin`, which must be importable. Blosc codecs are replaced by Zstd for
+        variable-length data. 'auto' picks a codec based on `dtype`: no compression for
+        floating-point data which is usually of high entropy, LZ4 with byte shuffling for other
+        fixed-size data if :mod:`hdf5plugin` is available or LZF otherwise, and Zstd for
+        variable-length data if :mod:`hdf5plugin` is available or gzip otherwise.
+    dtype : numpy.dtype, optional
+        the dtype of the dataset. Only used in 'auto' mode.
+
+    Returns
+    -------
+    dict
+        the keyword arguments
+    """
+    if compression == "auto":
+        dtype = np.dtype(dtype)
+        hdf5plugin = import_hdf5plugin()
+        if dtype.kind in "fc":
+            compression = None
+        elif dtype.kind in "biu":
+            compression = "lzf" if hdf5plugin is None else "blosc:lz4"
+        else:
+            compression = "gzip" if hdf5plugin is None else "zstd"
+
+    if compression is None or compression == "none":
+        return {}
+    if compression in ("gzip", "lzf"):
+        return {"compression": compression}
+    if isinstance(compression, int):
+        return {"compression": "gzip", "compression_opts": compression}
+    if compression in ("zstd", "blosc", "blosc:lz4", "blosc:zstd"):
+        hdf5plugin = import_hdf5plugin()
+        if hdf5plugin is None:
+            raise ImportError(
+                "Package 'hdf5plugin' is required for compression '{}'.".format(
+                    compression
+                )
+            )
+        if compression == "zstd" or np.dtype(dtype).kind == "O":
+            # the Blosc filter does not support variable-length data
+            return dict(hdf5plugin.Zstd())
+        cname = "lz4" if compression == "blosc" else compression[6:]
+        return dict(hdf5plugin.Blosc(cname=cname, shuffle=hdf5plugin.Blosc.SHUFFLE))
+    raise ValueError("Unknown compression '{}'.".format(compression))
+
+
+def get_chunk_shape(shape: tuple, itemsize: int, chunk_bytes: int = 1 << 18) -> tuple:
+    """Returns the chunk shape of a resizable dataset, splitting it along the first axis only.
+
+    The number of rows per chunk only depends on the size of a row, not on the number of rows,
+    so that appended rows keep filling chunks of the targeted size.
+
+    Parameters
+    ----------
+    shape : tuple
+        shape of the dataset
+    itemsize : int
+        number of bytes per element
+    chunk_bytes : int
+        targeted number of bytes per chunk
+
+    Returns
+    -------
+    tuple
+        the chunk shape
+    """
+    row_bytes = max(int(np.prod(shape[1:], dtype=np.int64)) * itemsize, 1)
+    return (max(chunk_bytes // row_bytes, 1),) + tuple(max(x, 1) for x in shape[1:])
+
+
+def compress_chunk(data: np.ndarray, chunk_shape: tuple, level: int) -> bytes:
+    """Compresses a chunk of a dataset the way the HDF5 deflate filter does.
+
+    The chunk is padded with zeros to the full chunk shape first.
+    """
+    import zlib
+
+    if data.shape != chunk_shape:
+        buf = np.zeros(chunk_shape, dtype=data.dtype)
+        buf[: len(data)] = data
+        data = buf
+    return zlib.compress(np.ascontiguousarray(data).tobytes(), level)
+
+
+def create_pdh5_dataset(
+    grp,
+    name: str,
+    data,
+    compression="gzip",
+    resizable: bool = False,
+    executor: tp.Optional[Executor] = None,
+    **kwargs
+):
+    """Creates a dataset in a pdh5 file with the given compression.
+
+    Parameters
+    ----------
+    grp : h5py.Group
+        the group to create the dataset in
+    name : str
+        name of the dataset
+    data : numpy.ndarray
+        content of the dataset
+    compression : str or int or None
+        compression codec. See :func:`compression_kwargs`.
+    resizable : bool
+        whether or not the dataset can be extended along the first axis later on. If True, the
+        dataset is chunked along the first axis only, in chunks of about 256 KiB, or 32 KiB if
+        uncompressed. See :func:`get_chunk_shape`.
+    executor : concurrent.futures.Executor, optional
+        an executor to compress the chunks of a resizable gzip-compressed dataset of fixed-size
+        elements concurrently. The compressed chunks are then written as-is, bypassing the HDF5
+        filter pipeline. Other datasets are compressed by HDF5 as usual.
+    **kwargs : dict
+        other keyword arguments passed as-is to :func:`h5py.Group.create_dataset`
+
+    Returns
+    -------
+    h5py.Dataset
+        the created dataset
+    """
+    data = np.asarray(data)
+    dtype = kwargs.get("dtype", None)
+    if dtype is None:
+        dtype = data.dtype
+    compression_opts = compression_kwargs(compression, dtype)
+    if resizable:
+        # the last chunk is padded, which compression shrinks to a few bytes, so only
+        # uncompressed datasets get smaller chunks
+        chunk_bytes = 1 << 18 if compression_opts else 1 << 15
+        kwargs["maxshape"] = (None,) + data.shape[1:]
+        kwargs["chunks"] = get_chunk_shape(
+            data.shape, np.dtype(dtype).itemsize, chunk_bytes=chunk_bytes
+        )
+
+    if (
+        executor is None
+        or not resizable
+        or compression_opts.get("compression", None) != "gzip"
+        or np.dtype(dtype) != data.dtype
+        or data.dtype.hasobject
+        or not data.dtype.isnative
+        or data.size == 0
+    ):
+        return grp.create_dataset(name, data=data, **compression_opts, **kwargs)
+
+    # compress the chunks concurrently and write them directly
+    kwargs.pop("dtype", None)
+    ds = grp.create_dataset(
+        name, shape=data.shape, dtype=data.dtype, **compression_opts, **kwargs
+    )
+    chunk_shape = kwargs["chunks"]
+    level = compression_opts.get("compression_opts", 4)  # h5py's default gzip level
+    starts = range(0, len(data), chunk_shape[0])
+    futures = [
+        executor.submit(
+            compress_chunk, data[start : start + chunk_shape[0]], chunk_shape, level
+        )
+        for start in starts
+    ]
+    for start, future in zip(starts, futures):
+        offset = (start,) + (0,) * (data.ndim - 1)
+        ds.id.write_direct_chunk(offset, future.result())
+    return ds
+
+
+def get_row_selection(
+    size: int, rows=None, max_rows: tp.Optional[int] = None
+) -> tp.Union[slice, np.ndarray]:
+    """Normalises a row selection of a pdh5 file.
+
+    Parameters
+    ----------
+    size : int
+        number of rows in the file
+    rows : slice or numpy.ndarray or list, optional
+        a slice with positive step, a boolean mask of length `size` or a strictly increasing
+        array of row ids. If not provided, all rows are selected.
+    max_rows : int, optional
+        limit the maximum number of selected rows, keeping the first ones
+
+    Returns
+    -------
+    slice or numpy.ndarray
+        either a slice with step 1 or a strictly increasing int64 array of row ids
+    """
+    if rows is None:
+        sel = slice(0, size)
+    elif isinstance(rows, slice):
+        start, stop, step = rows.indices(size)
+        if step < 0:
+            raise ValueError("Only slices with positive steps are supported.")
+        if step == 1:
+            sel = slice(start, max(start, stop))
+        else:
+            sel = np.arange(start, stop, step, dtype=np.int64)
+    else:
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            if rows.shape != (size,):
+                raise ValueError(
+                    "Expected a boolean mask of shape ({},). Got shape {}.".format(
+                        size, rows.shape
+                    )
+                )
+            sel = np.flatnonzero(rows).astype(np.int64)
+        else:
+            sel = rows.astype(np.int64).ravel()
+            if len(sel) > 0 and (sel[0] < 0 or sel[-1] >= size):
+                raise ValueError("Row ids must be in range [0, {}).".format(size))
+            if (np.diff(sel) <= 0).any():
+                raise ValueError("Row ids must be strictly increasing.")
+
+    if max_rows is not None:
+        if isinstance(sel, slice):
+            sel = slice(sel.start, min(sel.stop, sel.start + max_rows))
+        else:
+            sel = sel[:max_rows]
+    return sel
+
+
+def get_row_ids(sel: tp.Union[slice, np.ndarray]) -> tp.Sequence[int]:
+    """Returns the row ids of a normalised row selection."""
+    return range(sel.start, sel.stop) if isinstance(sel, slice) else sel.tolist()
+
+
+def read_rows(d, sel: tp.Union[slice, np.ndarray]) -> np.ndarray:
+    """Reads the selected rows of an HDF5 dataset.
+
+    A slice maps to a hyperslab selection. An array of row ids maps to a point selection if the
+    rows are sparse, or to a hyperslab selection of the covering range followed by an in-memory
+    selection if the rows are dense.
+    """
+    if isinstance(sel, slice):
+        return d[sel]
+    if len(sel) == 0:
+        return d[0:0]
+    start = sel[0]
+    stop = sel[-1] + 1
+    if len(sel) * 4 >= stop - start:  # dense enough
+        return d[start:stop][sel - start]
+    return d[sel]
+
+
+def read_spans(d, starts: np.ndarray, stops: np.ndarray, max_gap: int = 4096) -> list:
+    """Reads many ranges of a 1D HDF5 dataset, coalescing nearby ranges into single reads.
+
+    Parameters
+    ----------
+    d : h5py.Dataset
+        the 1D dataset to read from
+    starts : numpy.ndarray
+        non-decreasing start positions of the ranges
+    stops : numpy.ndarray
+        stop positions of the ranges, each not smaller than the corresponding start position
+    max_gap : int
+        maximum number of unwanted elements between two consecutive ranges for them to be read
+        together
+
+    Returns
+    -------
+    list
+        list of 1D arrays, one for each range
+    """
+    n = len(starts)
+    res = [None] * n
+    i = 0
+    while i < n:
+        j = i + 1
+        stop = stops[i]
+        while j < n and starts[j] <= stop + max_gap:
+            stop = max(stop, stops[j])
+            j += 1
+        start = starts[i]
+        buf = d[start:stop]
+        for k in range(i, j):
+            res[k] = buf[starts[k] - start : stops[k] - start]
+        i = j
+    return res
+
+
+def get_ndarray_layout(data: list) -> str:
+    """Determines how a list of ndarray cells should be laid out in a pdh5 file.
+
+    Returns 'stacked' if all non-null cells share the same dtype and shape, so that the column can
+    be stored as a single (N, ...) dataset. Returns 'ragged' if they share the same dtype and
+    number of dimensions but not the same shape, so that the column can be stored as a flat value
+    buffer plus offsets and shapes. Otherwise, returns 'rows', meaning one dataset per row.
+    """
+    dtype = None
+    shape = None
+    same_shape = True
+    for x in data:
+        if isnull(x):
+            continue
+        if x.dtype.hasobject:
+            return "rows"
+        if dtype is None:
+            dtype = x.dtype
+            shape = x.shape
+        elif x.dtype != dtype or x.ndim != len(shape):
+            return "rows"
+        elif x.shape != shape:
+            same_shape = False
+    if dtype is None:
+        return "rows"
+    return "stacked" if same_shape else "ragged"
+
+
+def encode_stacked_ndarrays(
+    data: list, shape: tp.Optional[tuple] = None, dtype=None
+) -> dict:
+    """Encodes a list of ndarray cells of the same dtype and shape into pdh5 datasets.
+
+    The shape and dtype are taken from the first non-null cell, or from arguments `shape` and
+    `dtype` if all cells are null.
+    """
+    size = len(data)
+    mask = np.array([isnull(x) for x in data], dtype=bool)
+    if not mask.all():
+        item = data[int(np.argmin(mask))]
+        shape, dtype = item.shape, item.dtype
+    values = np.zeros((size,) + tuple(shape), dtype=dtype)
+    for i, x in enumerate(data):
+        if not mask[i]:
+            values[i] = x
+    return {"values": values, "isnull": mask}
+
+
+def encode_ragged_ndarrays(
+    data: list, ndim: tp.Optional[int] = None, dtype=None
+) -> dict:
+    """Encodes a list of ndarray cells of the same dtype and ndim into pdh5 datasets.
+
+    The cells are raveled and concatenated into a 1D 'values' dataset. Cell i occupies
+    `values[offsets[i]:offsets[i+1]]` and has shape `shapes[i]`. The ndim and dtype are taken
+    from the first non-null cell, or from arguments `ndim` and `dtype` if all cells are null.
+    """
+    size = len(data)
+    mask = np.array([isnull(x) for x in data], dtype=bool)
+    if not mask.all():
+        item = data[int(np.argmin(mask))]
+        ndim, dtype = item.ndim, item.dtype
+    shapes = np.zeros((size, ndim), dtype=np.int64)
+    for i, x in enumerate(data):
+        if not mask[i]:
+            shapes[i] = x.shape
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.prod(shapes, axis=1), out=offsets[1:])
+    values = np.empty(offsets[-1], dtype=dtype)
+    for i, x in enumerate(data):
+        if not mask[i]:
+            values[offsets[i] : offsets[i + 1]] = x.ravel()
+    return {"values": values, "offsets": offsets, "shapes": shapes, "isnull": mask}
+
+
+def load_ndarray_cell(grp, layout: str, row_id: int):
+    """Loads an ndarray cell from a pdh5 group of layout 'stacked' or 'ragged'."""
+    if grp["isnull"][row_id]:
+        return None
+    if layout == "stacked":
+        return grp["values"][row_id]
+    start, stop = grp["offsets"][row_id : row_id + 2]
+    return grp["values"][start:stop].reshape(grp["shapes"][row_id])
+
+
+def load_ndarray_cells(grp, layout: str, sel: tp.Union[slice, np.ndarray]) -> list:
+    """Loads the selected ndarray cells from a pdh5 group of layout 'stacked' or 'ragged'.
+
+    The returning cells are views of arrays read in bulk from the file.
+    """
+    mask = read_rows(grp["isnull"], sel)
+    n = len(mask)
+    if layout == "stacked":
+        values = read_rows(grp["values"], sel)  # one read for the whole selection
+        return [None if mask[i] else values[i] for i in range(n)]
+    shapes = read_rows(grp["shapes"], sel)
+    if isinstance(sel, slice):
+        offsets = grp["offsets"][sel.start : sel.stop + 1]
+        values = grp["values"][offsets[0] : offsets[-1]]
+        offsets = offsets - offsets[0]
+        return [
+            None if mask[i] else values[offsets[i] : offsets[i + 1]].reshape(shapes[i])
+            for i in range(n)
+        ]
+    starts = read_rows(grp["offsets"], sel)
+    stops = read_rows(grp["offsets"], sel + 1)
+    spans = read_spans(grp["values"], starts, stops)
+    return [None if mask[i] else spans[i].reshape(shapes[i]) for i in range(n)]
+
+
+def get_sparse_layout(data: list) -> str:
+    """Determines how a list of SparseNdarray cells should be laid out in a pdh5 file.
+
+    Returns 'coo' if all non-null cells share the same dtype of values, the same dtype of indices
+    and the same rank, so that the column can be stored as flat value and index buffers plus
+    offsets and dense shapes. Otherwise, returns 'rows', meaning one group per row.
+    """
+    dtypes = None
+    for x in data:
+        if isnull(x):
+            continue
+        if x.values.dtype.hasobject or x.values.ndim != 1 or x.indices.ndim != 2:
+            return "rows"
+        dtypes2 = (x.values.dtype, x.indices.dtype, len(x.dense_shape))
+        if dtypes is None:
+            dtypes = dtypes2
+        elif dtypes2 != dtypes:
+            return "rows"
+    return "rows" if dtypes is None else "coo"
+
+
+def encode_sparse_cells(
+    data: list, rank: tp.Optional[int] = None, dtype=None, index_dtype=None
+) -> dict:
+    """Encodes a list of SparseNdarray cells of the same dtypes and rank into pdh5 datasets.
+
+    The values and the indices of the cells are concatenated into datasets 'values' and
+    'indices'. Cell i occupies rows `offsets[i]:offsets[i+1]` of both and has dense shape
+    `dense_shapes[i]`. The rank and dtypes are taken from the first non-null cell, or from the
+    arguments if all cells are null.
+    """
+    size = len(data)
+    mask = np.array([isnull(x) for x in data], dtype=bool)
+    if not mask.all():
+        item = data[int(np.argmin(mask))]
+        rank = len(item.dense_shape)
+        dtype, index_dtype = item.values.dtype, item.indices.dtype
+    dense_shapes = np.zeros((size, rank), dtype=np.int64)
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    for i, x in enumerate(data):
+        if not mask[i]:
+            dense_shapes[i] = x.dense_shape
+            offsets[i + 1] = len(x.values)
+    np.cumsum(offsets, out=offsets)
+    values = np.empty(offsets[-1], dtype=dtype)
+    indices = np.empty((offsets[-1], rank), dtype=index_dtype)
+    for i, x in enumerate(data):
+        if not mask[i]:
+            values[offsets[i] : offsets[i + 1]] = x.values
+            indices[offsets[i] : offsets[i + 1]] = x.indices
+    return {
+        "values": values,
+        "indices": indices,
+        "offsets": offsets,
+        "dense_shapes": dense_shapes,
+        "isnull": mask,
+    }
+
+
+def load_sparse_cell(grp, row_id: int):
+    """Loads a SparseNdarray cell from a pdh5 group of layout 'coo'."""
+    if grp["isnull"][row_id]:
+        return None
+    start, stop = grp["offsets"][row_id : row_id + 2]
+    return np.SparseNdarray(
+        grp["values"][start:stop],
+        grp["indices"][start:stop],
+        tuple(grp["dense_shapes"][row_id].tolist()),
+    )
+
+
+def read_sparse_buffers(grp, sel: tp.Union[slice, np.ndarray]) -> tuple:
+    """Reads the values and indices of the selected rows of a pdh5 group of layout 'coo'.
+
+    Returns the values, the indices and the offsets of the selected rows into them.
+    """
+    if isinstance(sel, slice):
+        offsets = grp["offsets"][sel.start : sel.stop + 1]
+        values = grp["values"][offsets[0] : offsets[-1]]
+        indices = grp["indices"][offsets[0] : offsets[-1]]
+        return values, indices, offsets - offsets[0]
+    starts = read_rows(grp["offsets"], sel)
+    stops = read_rows(grp["offsets"], sel + 1)
+    offsets = np.zeros(len(sel) + 1, dtype=np.int64)
+    np.cumsum(stops - starts, out=offsets[1:])
+    ds = grp["values"]
+    values = np.concatenate([ds[:0]] + read_spans(ds, starts, stops))
+    ds = grp["indices"]
+    indices = np.concatenate([ds[:0]] + read_spans(ds, starts, stops))
+    return values, indices, offsets
+
+
+def load_sparse_cells(grp, sel: tp.Union[slice, np.ndarray]) -> list:
+    """Loads the selected SparseNdarray cells from a pdh5 group of layout 'coo'.
+
+    The returning cells are views of arrays read in bulk from the file.
+    """
+    mask = read_rows(grp["isnull"], sel)
+    dense_shapes = read_rows(grp["dense_shapes"], sel).tolist()
+    values, indices, offsets = read_sparse_buffers(grp, sel)
+    return [
+        (
+            None
+            if mask[i]
+            else np.SparseNdarray(
+                values[offsets[i] : offsets[i + 1]],
+                indices[offsets[i] : offsets[i + 1]],
+                tuple(dense_shapes[i]),
+            )
+        )
+        for i in range(len(mask))
+    ]
+
+
+def load_sparse_csr(grp, sel: tp.Union[slice, np.ndarray]) -> tuple:
+    """Loads the selected cells of a pdh5 group of layout 'coo' as a CSR matrix, one row per cell.
+
+    The cells must be sparse vectors. Null cells become empty rows. The number of columns is the
+    largest dense shape of the cells.
+
+    Returns
+    -------
+    tuple
+        a `(data, indices, indptr, shape)` tuple as expected by :class:`scipy.sparse.csr_array`
+    """
+    if grp["dense_shapes"].shape[1] != 1:
+        raise ValueError(
+            "Only columns of sparse vectors can be viewed as a CSR matrix. Got rank {}.".format(
+                grp["dense_shapes"].shape[1]
+            )
+        )
+    dense_shapes = read_rows(grp["dense_shapes"], sel)
+    values, indices, offsets = read_sparse_buffers(grp, sel)
+    n_cols = int(dense_shapes.max()) if len(dense_shapes) > 0 else 0
+    return values, indices[:, 0], offsets, (len(dense_shapes), n_cols)
+
+
+def has_nonfinite_floats(x) -> bool:
+    """Checks whether a json object holds a NaN or infinite float, at any depth."""
+    if isinstance(x, float):
+        return not np.isfinite(x)
+    if isinstance(x, dict):
+        return any(has_nonfinite_floats(y) for y in x.values())
+    if isinstance(x, (list, tuple)):
+        return any(has_nonfinite_floats(y) for y in x)
+    return False
+
+
+def dump_json(x) -> bytes:
+    """Serialises a json object into bytes, using :mod:`orjson` if it is available.
+
+    Objects holding NaN or infinite floats, which :mod:`orjson` would turn into nulls, are
+    serialised by the json module instead.
+    """
+    orjson = import_orjson()
+    if orjson is not None:
+        try:
+            data = orjson.dumps(x, option=orjson.OPT_NON_STR_KEYS)
+            if b"null" not in data or not has_nonfinite_floats(x):
+                return data
+        except TypeError:  # not supported by orjson, e.g. integers beyond 64 bits
+            pass
+    return json.dumps(x).encode()
+
+
+BIG_INT_PATTERN = re.compile(rb"\d{19,}")
+
+
+def load_json(data: bytes):
+    """Deserialises a json object from bytes, using :mod:`orjson` if it is available.
+
+    Data with a digit sequence long enough to be an integer beyond 64 bits, which :mod:`orjson`
+    would turn into a float, is deserialised by the json module instead.
+    """
+    orjson = import_orjson()
+    if orjson is not None and BIG_INT_PATTERN.search(data) is None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:  # e.g. NaN written by the json module
+            pass
+    return json.loads(data)
+
+
+def encode_json_cells(data: list) -> dict:
+    """Encodes a list of json cells into pdh5 datasets.
+
+    The cells are serialised and concatenated into a 1D uint8 'values' dataset. Cell i occupies
+    `values[offsets[i]:offsets[i+1]]`.
+    """
+    mask = np.array([isnull(x) for x in data], dtype=bool)
+    l_bytes = [b"" if m else dump_json(x) for x, m in zip(data, mask)]
+    offsets = np.zeros(len(data) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, l_bytes), np.int64, len(data)), out=offsets[1:])
+    values = np.frombuffer(b"".join(l_bytes), dtype=np.uint8)
+    return {"values": values, "offsets": offsets, "isnull": mask}
+
+
+def load_json_cell(grp, row_id: int):
+    """Loads a json cell of the 'buffer' layout of a pdh5 file."""
+    if grp["isnull"][row_id]:
+        return None
+    start, stop = grp["offsets"][row_id : row_id + 2]
+    return load_json(grp["values"][start:stop].tobytes())
+
+
+def load_json_cells(grp, sel: tp.Union[slice, np.ndarray]) -> list:
+    """Loads the selected json cells of the 'buffer' layout of a pdh5 file.
+
+    A contiguous selection is read with a single read of the buffer.
+    """
+    mask = read_rows(grp["isnull"], sel)
+    if isinstance(sel, slice):
+        offsets = grp["offsets"][sel.start : sel.stop + 1]
+        buf = grp["values"][offsets[0] : offsets[-1]].tobytes()
+        offsets = offsets - offsets[0]
+        return [
+            None if mask[i] else load_json(buf[offsets[i] : offsets[i + 1]])
+            for i in range(len(mask))
+        ]
+    starts = read_rows(grp["offsets"], sel)
+    stops = read_rows(grp["offsets"], sel + 1)
+    spans = read_spans(grp["values"], starts, stops)
+    return [
+        None if mask[i] else load_json(spans[i].tobytes()) for i in range(len(mask))
+    ]
+
+
+IMAGE_CODECS = ("raw", "png", "jpeg", "webp")
+
+
+def parse_image_codec(image_codec: str) -> tp.Tuple[str, tp.Optional[int]]:
+    """Parses an image codec option like 'png', 'jpeg:90' or 'webp:80' into a codec and a quality.
+
+    The quality is a JPEG or WebP quality from 0 to 100, or a PNG compression level from 0 to 9.
+    'jpg' is an alias of 'jpeg'.
+    """
+    codec, _, quality = str(image_codec).partition(":")
+    if codec == "jpg":
+        codec = "jpeg"
+    if codec not in IMAGE_CODECS or (codec == "raw" and quality):
+        raise ValueError("Unknown image codec '{}'.".format(image_codec))
+    try:
+        quality = int(quality) if quality else None
+    except ValueError:
+        raise ValueError("Invalid quality of image codec '{}'.".format(image_codec))
+    return codec, quality
+
+
+def get_cv_channels(pixel_format: str) -> tp.List[int]:
+    """Returns the channels of an image of a given pixel format, in OpenCV's BGR(A) order."""
+    order = "bgra" if "a" in pixel_format else "bgr"
+    if sorted(pixel_format) != sorted(order):
+        raise ValueError(
+            "Pixel format '{}' is not supported by image codecs.".format(pixel_format)
+        )
+    return [pixel_format.index(c) for c in order]
+
+
+def encode_image(image: cv.Image, codec: str, quality: tp.Optional[int] = None):
+    """Encodes the pixels of an image with OpenCV, returning a 1D uint8 array.
+
+    Multi-channel pixels are converted to OpenCV's BGR(A) order before encoding.
+    """
+    pixels = image.image
+    if pixels.ndim == 3 and pixels.shape[2] > 1:
+        channels = get_cv_channels(image.pixel_format)
+        if codec == "jpeg" and len(channels) == 4:
+            raise ValueError(
+                "Codec 'jpeg' does not support pixel format '{}'. Please use 'png' or "
+                "'webp' instead.".format(image.pixel_format)
+            )
+        pixels = pixels[:, :, channels]
+    if pixels.dtype != np.uint8 and (codec != "png" or pixels.dtype != np.uint16):
+        raise ValueError(
+            "Codec '{}' does not support images of dtype '{}'.".format(
+                codec, pixels.dtype
+            )
+        )
+    if codec == "png":
+        ext, flag = ".png", cv.IMWRITE_PNG_COMPRESSION
+    elif codec == "jpeg":
+        ext, flag = ".jpg", cv.IMWRITE_JPEG_QUALITY
+    else:
+        ext, flag = ".webp", cv.IMWRITE_WEBP_QUALITY
+    params = [] if quality is None else [flag, quality]
+    retval, buf = cv.imencode(ext, pixels, params)
+    if not retval:
+        raise ValueError(
+            "Unable to encode an image of shape {} with codec '{}'.".format(
+                pixels.shape, codec
+            )
+        )
+    return buf.ravel()
+
+
+def decode_image(buf: np.ndarray, shape, pixel_format: str, meta: str) -> cv.Image:
+    """Decodes an image encoded by :func:`encode_image`.
+
+    A shape with 0 channels means a 2D image.
+    """
+    pixels = cv.imdecode(buf, cv.IMREAD_UNCHANGED)
+    if pixels is None:
+        raise ValueError("Unable to decode an image of {} bytes.".format(len(buf)))
+    if pixels.ndim == 3 and shape[2] <= 1:  # WebP has no grayscale mode
+        pixels = cv.cvtColor(pixels, cv.COLOR_BGR2GRAY)
+    elif pixels.ndim == 3 and pixels.shape[2] > 1:
+        out = np.empty_like(pixels)
+        out[:, :, get_cv_channels(pixel_format)] = pixels
+        pixels = out
+    pixels = pixels.reshape(tuple(shape) if shape[2] else tuple(shape[:2]))
+    return cv.Image(pixels, pixel_format=pixel_format, meta=json.loads(meta))
+
+
+def encode_image_cells(
+    data: list, codec: str, quality: tp.Optional[int] = None
+) -> dict:
+    """Encodes a list of Image cells into the 'encoded' layout of a pdh5 file.
+
+    The encoded images are concatenated into a 1D uint8 'values' dataset. Cell i occupies
+    `values[offsets[i]:offsets[i+1]]`, has pixel shape `shapes[i]`, with 0 channels for a 2D
+    image, and pixel format and json-encoded metadata `pixel_format[i]` and `meta[i]`.
+    """
+    size = len(data)
+    mask = np.array([isnull(x) for x in data], dtype=bool)
+    shapes = np.zeros((size, 3), dtype=np.int64)
+    pixel_formats = np.full(size, "", dtype=object)
+    metas = np.full(size, "", dtype=object)
+    bufs = []
+    for i, x in enumerate(data):
+        if mask[i]:
+            continue
+        shapes[i, : x.image.ndim] = x.image.shape
+        pixel_formats[i] = x.pixel_format
+        metas[i] = json.dumps(x.meta)
+        bufs.append(encode_image(x, codec, quality))
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    offsets[1:][~mask] = [len(x) for x in bufs]
+    np.cumsum(offsets, out=offsets)
+    values = np.concatenate(bufs) if bufs else np.zeros(0, dtype=np.uint8)
+    return {
+        "values": values,
+        "offsets": offsets,
+        "shapes": shapes,
+        "pixel_format": pixel_formats,
+        "meta": metas,
+        "isnull": mask,
+    }
+
+
+def load_image_cell(grp, row_id: int):
+    """Loads and decodes an Image cell of the 'encoded' layout of a pdh5 file."""
+    if grp["isnull"][row_id]:
+        return None
+    start, stop = grp["offsets"][row_id : row_id + 2]
+    return decode_image(
+        grp["values"][start:stop],
+        grp["shapes"][row_id],
+        grp["pixel_format"].asstr()[row_id],
+        grp["meta"].asstr()[row_id],
+    )
+
+
+def load_image_cells(
+    grp, sel: tp.Union[slice, np.ndarray], n_threads: tp.Optional[int] = None
+) -> list:
+    """Loads the selected Image cells of the 'encoded' layout of a pdh5 file.
+
+    The encoded bytes are read in bulk. If `n_threads` is more than 1, the images are decoded
+    concurrently in a thread pool. OpenCV releases the GIL while decoding.
+    """
+    mask = read_rows(grp["isnull"], sel)
+    n = len(mask)
+    shapes = read_rows(grp["shapes"], sel)
+    pixel_formats = read_rows(grp["pixel_format"].asstr(), sel)
+    metas = read_rows(grp["meta"].asstr(), sel)
+    if isinstance(sel, slice):
+        offsets = grp["offsets"][sel.start : sel.stop + 1]
+        values = grp["values"][offsets[0] : offsets[-1]]
+        offsets = offsets - offsets[0]
+        bufs = [values[offsets[i] : offsets[i + 1]] for i in range(n)]
+    else:
+        starts = read_rows(grp["offsets"], sel)
+        stops = read_rows(grp["offsets"], sel + 1)
+        bufs = read_spans(grp["values"], starts, stops)
+
+    def decode(i):
+        if mask[i]:
+            return None
+        return decode_image(bufs[i], shapes[i], pixel_formats[i], metas[i])
+
+    if n_threads is not None and n_threads > 1 and n > 1:
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            return list(executor.map(decode, range(n)))
+    return [decode(i) for i in range(n)]
+
+
+def encode_datetimes(s: pd.Series, dftype: str) -> tp.Optional[tuple]:
+    """Encodes a Timestamp or Timedelta series into int64 nanoseconds.
+
+    Parameters
+    ----------
+    s : pandas.Series
+        the series to encode
+    dftype : {'Timestamp', 'Timedelta'}
+        the dftype of the series
+
+    Returns
+    -------
+    tuple or None
+        a tuple `(values, mask, tz)` where `values` is an int64 array of nanoseconds since the
+        epoch in UTC (for 'Timestamp') or nanoseconds (for 'Timedelta'), `mask` is the boolean
+        null mask and `tz` is the name of the common timezone or None. None is returned if the
+        series cannot be represented that way, e.g. because of mixed timezones or out-of-bound
+        values.
+    """
+    tz = None
+    try:
+        if dftype == "Timestamp":
+            x = pd.DatetimeIndex(s)
+            if x.tz is not None:
+                tz = str(x.tz)
+                pd.Timestamp(0, tz="UTC").tz_convert(tz)  # make sure tz can be restored
+                x = x.tz_convert(None)
+        else:
+            x = pd.TimedeltaIndex(s)
+        if hasattr(x, "as_unit"):  # pandas >= 2.0
+            x = x.as_unit("ns")
+    except (ValueError, TypeError, KeyError):  # OutOfBoundsDatetime is a ValueError
+        return None
+    return x.asi8, x.isna(), tz
+
+
+def decode_datetimes(
+    values: np.ndarray, mask: np.ndarray, dftype: str, tz=None, dtype=None
+):
+    """Decodes int64 nanoseconds into a DatetimeIndex or a TimedeltaIndex.
+
+    It is the inverse of :func:`encode_datetimes`. If the original `dtype` is provided, its time
+    unit is restored, unless some values are not whole multiples of the unit, e.g. because rows
+    of a finer unit were appended. Otherwise the unit is nanoseconds.
+    """
+    values = values.copy()
+    unit = None
+    if dtype is not None and hasattr(pd.DatetimeIndex, "as_unit"):  # pandas >= 2.0
+        try:
+            dtype = pd.api.types.pandas_dtype(dtype)
+            unit = dtype.unit if hasattr(dtype, "unit") else np.datetime_data(dtype)[0]
+            factor = np.timedelta64(1, unit) // np.timedelta64(1, "ns")
+        except (TypeError, ValueError):
+            unit = None
+        if unit is not None and (values[~mask] % factor != 0).any():
+            unit = None  # restoring the unit would lose precision
+    values[mask] = np.iinfo(np.int64).min  # NaT
+    if dftype == "Timedelta":
+        x = pd.TimedeltaIndex(values.view("timedelta64[ns]"))
+    else:
+        x = pd.DatetimeIndex(values.view("datetime64[ns]"))
+        if tz is not None:
+            x = x.tz_localize("UTC").tz_convert(tz)
+    return x if unit is None else x.as_unit(unit)
+
+
+MASKED_DFTYPES = (
+    "Int8",
+    "Int16",
+    "Int32",
+    "Int64",
+    "UInt8",
+    "UInt16",
+    "UInt32",
+    "UInt64",
+    "Float32",
+    "Float64",
+    "boolean",
+)
+
+
+def get_pdh5_dftype(s: pd.Series) -> str:
+    """Detects the dftype of a series for saving into a pdh5 file.
+
+    It is :func:`mt.pandas.dftype.get_dftype` except that categorical and nullable extension
+    dtypes are detected from the dtype of the series, without scanning its elements. In
+    particular, a categorical series of strings has dftype 'category' rather than 'str'.
+    """
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        return "category"
+    dftype = str(s.dtype)
+    if dftype in MASKED_DFTYPES or dftype == "string":
+        return dftype
+    return get_dftype(s)
+
+
+def encode_categories(categories: pd.Index) -> tp.Tuple[np.ndarray, str]:
+    """Encodes the categories of a categorical series into an array and its dtype name.
+
+    Categories must be either all strings or numbers.
+    """
+    if categories.dtype.kind in "biuf":
+        return categories.to_numpy(), str(categories.dtype)
+    values = categories.to_numpy(dtype=object)
+    if all(isinstance(x, str) for x in values):
+        return values, "str"
+    raise ValueError(
+        "Only categories of strings or numbers are supported. Got: {}.".format(
+            categories.dtype
+        )
+    )
+
+
+def load_categories(grp) -> np.ndarray:
+    """Loads the categories of a 'category' layout in a pdh5 file."""
+    if grp.attrs["categories_dtype"] == "str":
+        return grp["categories"].asstr()[()]
+    return grp["categories"][()]
 
 
 def load_special_cell(grp, key, dftype):
@@ -33,60 +1019,579 @@ def load_special_cell(grp, key, dftype):
     raise ValueError("Unknown dftype while loading cells: '{}'.".format(dftype))
 
 
-class Pdh5Column:
-    """A read-only column of a pdh5 file."""
+def get_cell_nbytes(value) -> int:
+    """Estimates the number of bytes held by a decoded pdh5 cell."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, cv.Image):
+        return value.image.nbytes
+    if isinstance(value, np.SparseNdarray):
+        return value.values.nbytes + value.indices.nbytes
+    return sys.getsizeof(value)
 
-    def __init__(self, filepath: str, col_id: str):
-        self.filepath = filepath
-        self.col_id = col_id
-        self.col = None
-        self.dftype = None
-        self.loaded = False
 
-    def get_item(self, row_id: int):
-        if not self.loaded:
-            import h5py
+class Pdh5CellCache:
+    """A thread-safe LRU cache of decoded pdh5 cells with a memory budget.
 
-            f = h5py.File(self.filepath, mode="r")
-            columns = json.loads(f.attrs["columns"])
-            self.dftype = columns[self.col_id]
-            key = "column_" + text_filename(self.col_id)
-            if self.dftype != "none":
-                self.col = f[key]
-            self.loaded = True
+    Cells are keyed by the real path and the modification time of the file, the column and the
+    row id, so that the cells of a file rewritten on disk are never served. The least recently
+    used cells are evicted when the total estimated size of the cached cells exceeds the budget.
 
-        if self.dftype == "none":
-            return None
-        if self.dftype == "json":
-            x = self.col[row_id]
-            return None if x == b"" else json.loads(x)
-        if self.dftype in ("ndarray", "Image", "SparseNdarray"):
-            key = str(row_id)
-            if not key in self.col:
-                return None
-            return load_special_cell(self.col, key, self.dftype)
+    Parameters
+    ----------
+    max_bytes : int
+        the memory budget in bytes. If 0, nothing is cached.
+    """
 
+    def __init__(self, max_bytes: int = 1 << 30):
+        self._cells = OrderedDict()
+        self._lock = threading.RLock()
+        self._nbytes = 0
+        self.max_bytes = max_bytes
 
-class Pdh5Cell:
-    """A read-only cell of a pdh5 column."""
+    def __len__(self):
+        return len(self._cells)
 
-    def __init__(self, col: Pdh5Column, row_id: int):
+    def __contains__(self, key: tuple):
+        return key in self._cells
+
+    @property
+    def nbytes(self) -> int:
+        """the total estimated size of the cached cells in bytes"""
+        return self._nbytes
+
+    @property
+    def max_bytes(self) -> int:
+        """the memory budget in bytes"""
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, max_bytes: int):
+        if max_bytes < 0:
+            raise ValueError(
+                "Argument 'max_bytes' must not be negative. Got {}.".format(max_bytes)
+            )
+        with self._lock:
+            self._max_bytes = max_bytes
+            self._trim()
+
+    def _trim(self):
+        while self._nbytes > self._max_bytes:
+            _, (_, nbytes) = self._cells.popitem(last=False)
+            self._nbytes -= nbytes
+
+    def get(self, key: tuple) -> tuple:
+        """Looks up a cell.
+
+        Parameters
+        ----------
+        key : tuple
+            the `(realpath, mtime_ns, col_id, row_id)` key of the cell
+
+        Returns
+        -------
+        found : bool
+            whether the cell is cached
+        value : object
+            the cached value if found, None otherwise
+        """
+        with self._lock:
+            item = self._cells.get(key, None)
+            if item is None:
+                return False, None
+            self._cells.move_to_end(key)
+            return True, item[0]
+
+    def put(self, key: tuple, value):
+        """Caches a cell, evicting the least recently used cells if needed.
+
+        Parameters
+        ----------
+        key : tuple
+            the `(realpath, mtime_ns, col_id, row_id)` key of the cell
+        value : object
+            the decoded value of the cell
+        """
+        nbytes = get_cell_nbytes(value)
+        with self._lock:
+            self.pop(key)
+            if nbytes > self._max_bytes:
+                return
+            self._cells[key] = (value, nbytes)
+            self._nbytes += nbytes
+            self._trim()
+
+    def pop(self, key: tuple):
+        """Removes a cell from the cache if it is cached."""
+        with self._lock:
+            item = self._cells.pop(key, None)
+            if item is not None:
+                self._nbytes -= item[1]
+
+    def clear(self, filepath: tp.Optional[str] = None):
+        """Removes the cells of a file, or all cells.
+
+        Parameters
+        ----------
+        filepath : str, optional
+            path to the file whose cells are to be removed. If not provided, all cells are removed.
+        """
+        with self._lock:
+            if filepath is None:
+                self._cells.clear()
+                self._nbytes = 0
+                return
+            realpath = os.path.realpath(filepath)
+            for key in [x for x in self._cells if x[0] == realpath]:
+                self.pop(key)
+
+
+pdh5_cell_cache = Pdh5CellCache()
+"""The process-wide cache of decoded cells used by :class:`Pdh5Column`."""
+
+
+class Pdh5FilePool:
+    """A bounded pool of read-only pdh5 file handles, evicting the least recently used ones.
+
+    Handles are keyed by the real path and the modification time of the file, so that a file
+    rewritten on disk gets a fresh handle. All columns of the same file share the same handle.
+    Handles are used through :meth:`borrow`. A handle evicted or closed by the pool while it is
+    borrowed stays open until it is returned. The pool is thread-safe and can be used as a
+    context manager, closing all handles on exit.
+
+    Parameters
+    ----------
+    max_size : int
+        maximum number of handles kept in the pool at the same time. Borrowed handles evicted
+        from the pool are not counted.
+    """
+
+    def __init__(self, max_size: int = 16):
+        self._files = OrderedDict()
+        self._borrow_counts = {}  # id(f) -> number of borrowers
+        self._evicted = {}  # id(f) -> f, for borrowed handles evicted from the pool
+        self._lock = threading.RLock()
+        self.max_size = max_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._files)
+
+    @property
+    def max_size(self) -> int:
+        """maximum number of handles kept in the pool at the same time"""
+        return self._max_size
+
+    @max_size.setter
+    def max_size(self, max_size: int):
+        if max_size < 1:
+            raise ValueError(
+                "Argument 'max_size' must be positive. Got {}.".format(max_size)
+            )
+        with self._lock:
+            self._max_size = max_size
+            self._trim()
+
+    def _evict(self, f):
+        if self._borrow_counts.get(id(f), 0) > 0:
+            self._evicted[id(f)] = f  # closed when returned
+        else:
+            f.close()
+
+    def _trim(self):
+        while len(self._files) > self._max_size:
+            _, f = self._files.popitem(last=False)
+            self._evict(f)
+
+    def get(self, filepath: str):
+        """Returns an open read-only handle of a pdh5 file, opening it if needed.
+
+        Parameters
+        ----------
+        filepath : str
+            local path to the file
+
+        Returns
+        -------
+        h5py.File
+            the opened file. It may be closed by the pool at any time, even while being read by
+            another thread. Use :meth:`borrow` instead unless the pool is used by a single
+            thread.
+        """
+        key = (os.path.realpath(filepath), os.stat(filepath).st_mtime_ns)
+        with self._lock:
+            f = self._files.get(key, None)
+            if f is not None and f.id.valid:
+                self._files.move_to_end(key)
+                return f
+
+            import h5py
+
+            import_hdf5plugin()
+            f = h5py.File(filepath, mode="r")
+            for key2 in [x for x in self._files if x[0] == key[0]]:  # stale handles
+                self._evict(self._files.pop(key2))
+                pdh5_cell_cache.clear(key[0])
+            self._files[key] = f
+            self._trim()
+            return f
+
+    @contextlib.contextmanager
+    def borrow(self, filepath: str):
+        """A context manager that borrows an open read-only handle of a pdh5 file.
+
+        The handle is not closed while it is borrowed, even if the pool evicts or closes it.
+
+        Parameters
+        ----------
+        filepath : str
+            local path to the file
+
+        Yields
+        ------
+        h5py.File
+            the opened file
+        """
+        with self._lock:
+            f = self.get(filepath)
+            self._borrow_counts[id(f)] = self._borrow_counts.get(id(f), 0) + 1
+        try:
+            yield f
+        finally:
+            with self._lock:
+                count = self._borrow_counts.pop(id(f)) - 1
+                if count > 0:
+                    self._borrow_counts[id(f)] = count
+                elif id(f) in self._evicted:
+                    self._evicted.pop(id(f)).close()
+
+    def close(self, filepath: tp.Optional[str] = None):
+        """Closes the handles of a file, or all handles.
+
+        Borrowed handles are removed from the pool right away but closed only once they are
+        returned, so other users of the file are not disrupted.
+
+        Parameters
+        ----------
+        filepath : str, optional
+            local path to the file whose handles are to be closed. If not provided, all handles
+            are closed.
+        """
+        realpath = None if filepath is None else os.path.realpath(filepath)
+        with self._lock:
+            for key in list(self._files):
+                if realpath is None or key[0] == realpath:
+                    self._evict(self._files.pop(key))
+
+
+pdh5_file_pool = Pdh5FilePool()
+"""The process-wide pool of read-only pdh5 file handles used by :class:`Pdh5Column`."""
+
+
+class Pdh5Column:
+    """A read-only column of a pdh5 file.
+
+    The file is accessed through the process-wide :data:`pdh5_file_pool` and decoded cells are
+    kept in the process-wide :data:`pdh5_cell_cache`, keyed by the modification time of the file
+    when the column is created. The column can be used as a context manager, closing the file
+    handle on exit.
+    """
+
+    def __init__(self, filepath: str, col_id: str):
+        self.filepath = filepath
+        self.col_id = col_id
+        self.key = "column_" + text_filename(col_id)
+        self.realpath = os.path.realpath(filepath)
+        self.mtime_ns = os.stat(filepath).st_mtime_ns
+        self.dftype = None
+        self.loaded = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_col(self, f):
+        """Returns the HDF5 object of the column in the opened file, or None if it is all-null."""
+        if not self.loaded:
+            columns = json.loads(f.attrs["columns"])
+            self.dftype = columns[self.col_id]
+            self.loaded = True
+        return None if self.dftype == "none" else f[self.key]
+
+    def close(self):
+        """Releases the pooled file handle shared by the columns of the file.
+
+        Threads still reading through the handle keep it open until they are done. See
+        :meth:`Pdh5FilePool.close`.
+        """
+        pdh5_file_pool.close(self.filepath)
+
+    def get_cache_key(self, row_id: int) -> tuple:
+        """Returns the key of a cell in :data:`pdh5_cell_cache`."""
+        return (self.realpath, self.mtime_ns, self.col_id, row_id)
+
+    def get_item(self, row_id: int):
+        """Loads a cell, looking it up in the cache first."""
+        found, value = pdh5_cell_cache.get(self.get_cache_key(row_id))
+        if found:
+            return value
+        value = self.load_item(row_id)
+        pdh5_cell_cache.put(self.get_cache_key(row_id), value)
+        return value
+
+    def load_item(self, row_id: int):
+        """Loads a cell from the file, bypassing the cache."""
+        with pdh5_file_pool.borrow(self.filepath) as f:
+            return self.load_item_from(self.get_col(f), row_id)
+
+    def load_item_from(self, col, row_id: int):
+        """Loads a cell from the HDF5 object of the column."""
+        if self.dftype == "none":
+            return None
+        if self.dftype == "json":
+            if col.attrs.get("layout", None) == "buffer":
+                return load_json_cell(col, row_id)
+            x = col[row_id]
+            return None if x == b"" else json.loads(x)
+        if self.dftype in ("ndarray", "Image", "SparseNdarray"):
+            layout = col.attrs.get("layout", "rows")
+            if layout == "encoded":
+                return load_image_cell(col, row_id)
+            if layout == "coo":
+                return load_sparse_cell(col, row_id)
+            if layout != "rows":
+                return load_ndarray_cell(col, layout, row_id)
+            key = str(row_id)
+            if not key in col:
+                return None
+            return load_special_cell(col, key, self.dftype)
+
+    def get_items(self, row_ids, n_threads: tp.Optional[int] = None) -> list:
+        """Loads many cells, reading the uncached ones in one sorted, coalesced pass.
+
+        Parameters
+        ----------
+        row_ids : list
+            list of row ids, in any order and possibly with duplicates
+        n_threads : int, optional
+            number of threads to decode encoded images concurrently
+
+        Returns
+        -------
+        list
+            the values of the cells, in the same order as `row_ids`
+        """
+        values = {}
+        missing_row_ids = []
+        for row_id in set(int(x) for x in row_ids):
+            found, value = pdh5_cell_cache.get(self.get_cache_key(row_id))
+            if found:
+                values[row_id] = value
+            else:
+                missing_row_ids.append(row_id)
+
+        if missing_row_ids:
+            sel = np.array(sorted(missing_row_ids), dtype=np.int64)
+            with pdh5_file_pool.borrow(self.filepath) as f:
+                self.get_col(f)  # make sure the dftype is known
+                s = load_pdh5_column(
+                    f, self.col_id, self.dftype, sel, n_threads=n_threads
+                )
+            for row_id, value in zip(sel.tolist(), s.tolist()):
+                values[row_id] = value
+                pdh5_cell_cache.put(self.get_cache_key(row_id), value)
+
+        return [values[int(x)] for x in row_ids]
+
+    def prefetch(self, row_ids, n_threads: tp.Optional[int] = None):
+        """Loads many cells into the cache in one sorted, coalesced pass.
+
+        Parameters
+        ----------
+        row_ids : list
+            list of row ids, in any order and possibly with duplicates
+        n_threads : int, optional
+            number of threads to decode encoded images concurrently
+        """
+        self.get_items(row_ids, n_threads=n_threads)
+
+
+class Pdh5Cell:
+    """A read-only cell of a pdh5 column.
+
+    The decoded value is kept in :data:`pdh5_cell_cache` rather than in the cell itself, so that
+    memory stays bounded. Use :func:`load_pdh5_cells` to materialise many cells at once.
+    """
+
+    def __init__(self, col: Pdh5Column, row_id: int):
         self.col = col
         self.row_id = row_id
-        self._value = None
-        self.loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        """whether the value is currently cached"""
+        return self.col.get_cache_key(self.row_id) in pdh5_cell_cache
 
     @property
     def value(self):
-        if not self.loaded:
-            self._value = self.col.get_item(self.row_id)
-            self.loaded = True
-        return self._value
+        return self.col.get_item(self.row_id)
+
+    def release(self):
+        """Removes the value from the cache."""
+        pdh5_cell_cache.pop(self.col.get_cache_key(self.row_id))
+
+
+def load_pdh5_cells(cells, n_threads: tp.Optional[int] = None) -> list:
+    """Materialises many pdh5 cells, reading the cells of each column in one batch.
+
+    Parameters
+    ----------
+    cells : pandas.Series or list
+        a collection of cells. Items that are not instances of :class:`Pdh5Cell` are passed
+        through.
+    n_threads : int, optional
+        number of threads to decode the images of encoded Image columns concurrently. If not
+        provided or 1, the images are decoded one after another.
+
+    Returns
+    -------
+    list
+        the values of the cells, in the same order
+    """
+    cells = list(cells)
+    res = list(cells)
+    col_map = {}  # id(col) -> (col, positions)
+    for i, cell in enumerate(cells):
+        if isinstance(cell, Pdh5Cell):
+            col_map.setdefault(id(cell.col), (cell.col, []))[1].append(i)
+    for col, positions in col_map.values():
+        values = col.get_items(
+            [cells[i].row_id for i in positions], n_threads=n_threads
+        )
+        for i, value in zip(positions, values):
+            res[i] = value
+    return res
+
+
+@contextlib.contextmanager
+def open_pdh5_file(
+    filepath: str, io_mode: str = "direct", data: tp.Optional[bytes] = None
+):
+    """A context manager that opens a pdh5 file for reading.
+
+    Parameters
+    ----------
+    filepath : str
+        local path to the file
+    io_mode : {'buffer', 'mmap', 'direct'}
+        If 'buffer', the HDF5 image is opened from `data`, the content of the file already read
+        into memory. If 'mmap', the file is memory-mapped and opened from the mapping, letting the
+        OS page cache serve the reads. If 'direct', the file is opened by path with the default
+        HDF5 driver, reading only the parts that are needed.
+    data : bytes, optional
+        the content of the file. Only valid and required for 'buffer' mode.
+
+    Yields
+    ------
+    h5py.File
+        the opened file
+    """
+    import h5py
+
+    import_hdf5plugin()  # to be able to read datasets compressed with its filters
+    if io_mode == "buffer":
+        if data is None:
+            raise ValueError("Argument 'data' is required for 'buffer' mode.")
+        with h5py.File(BytesIO(data), "r") as f:
+            yield f
+    elif io_mode == "mmap":
+        with open(filepath, "rb") as fobj, mmap.mmap(
+            fobj.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm, h5py.File(mm, "r") as f:
+            yield f
+    elif io_mode == "direct":
+        with h5py.File(filepath, "r") as f:
+            yield f
+    else:
+        raise ValueError("Unknown io mode '{}'.".format(io_mode))
+
+
+def get_index_dftype(index: pd.Index) -> str:
+    """Detects the dftype of a flat index for saving into a pdh5 file."""
+    if isinstance(index, pd.DatetimeIndex):
+        return "Timestamp"
+    if isinstance(index, pd.TimedeltaIndex):
+        return "Timedelta"
+    if (
+        len(index) == 0
+        and isinstance(index.dtype, np.dtype)
+        and index.dtype.kind in "biuf"
+    ):
+        return str(index.dtype)
+    dftype = get_pdh5_dftype(pd.Series(index))
+    if dftype == "none" or (dftype == "object" and len(index) == 0):
+        return "str"
+    return dftype
 
 
-def save_pdh5_index(f, df: pd.DataFrame, spinner=None):
+def save_pdh5_flat_index(grp, index: pd.Index, compression="gzip"):
+    """Saves the values of a flat index into a pdh5 group, using the layout of a column."""
+    dftype = get_index_dftype(index)
+    enc = encode_pdh5_column(pd.Series(index), dftype)
+    if enc is None or enc["layout"] == "rows":
+        raise ValueError("Unsupported index of dftype '{}'.".format(dftype))
+    grp.attrs["dtype"] = str(index.dtype)
+    grp.attrs["dftype"] = dftype
+    write_pdh5_column(grp, "values", dftype, enc, compression=compression)
+
+
+def load_pdh5_flat_index(grp, sel: tp.Union[slice, np.ndarray], name=None) -> pd.Index:
+    """Loads the selected values of a flat index saved by :func:`save_pdh5_flat_index`."""
+    if "dftype" in grp.attrs:
+        dftype = grp.attrs["dftype"]
+        index = pd.Index(
+            load_pdh5_column(grp, name, dftype, sel, key="values"), name=name
+        )
+        dtype = grp.attrs["dtype"]
+        if dftype in ("Timestamp", "Timedelta") and str(index.dtype) != dtype:
+            try:  # restore the time unit
+                index = index.astype(dtype)
+            except (ValueError, TypeError):
+                pass
+        return index
+    # legacy layout with a plain dataset of numbers
+    dtype = grp.attrs.get("dtype", None)
+    return pd.Index(data=read_rows(grp["values"], sel), dtype=dtype, name=name)
+
+
+def append_pdh5_flat_index(grp, index: pd.Index, size: int, compression="gzip"):
+    """Appends the values of a flat index to a flat index saved in a pdh5 group.
+
+    It is the appending counterpart of :func:`save_pdh5_flat_index`.
+    """
+    dftype = grp.attrs.get("dftype", None)
+    if dftype is None:  # legacy layout with a plain dataset of numbers
+        dftype = str(grp["values"].dtype)
+    if len(index) > 0 and get_index_dftype(index) != dftype:
+        raise ValueError(
+            "Mismatched dftype of the index. Stored: '{}'. Got: '{}'.".format(
+                dftype, get_index_dftype(index)
+            )
+        )
+    enc = encode_pdh5_column(pd.Series(index), dftype, like=grp["values"])
+    append_pdh5_column(grp, "values", dftype, enc, size, compression=compression)
+
+
+def save_pdh5_index(f, df: pd.DataFrame, spinner=None, compression="gzip"):
     f.attrs["format"] = "pdh5"
-    f.attrs["version"] = "1.0"
+    f.attrs["version"] = "1.1"
     size = len(df)
     f.attrs["size"] = size
 
@@ -106,341 +1611,2853 @@ def save_pdh5_index(f, df: pd.DataFrame, spinner=None):
             grp.attrs["step"] = index.step
         if index.name is not None:
             grp.attrs["name"] = index.name
-    elif hasattr(pd, "Index") and isinstance(index, pd.Index):
+    elif isinstance(index, pd.MultiIndex):
+        # levels are saved like flat indices and codes as int32 datasets
+        grp.attrs["type"] = "MultiIndex"
+        grp.attrs["names"] = json.dumps(list(index.names))
+        grp.attrs["nlevels"] = index.nlevels
+        for i, level in enumerate(index.levels):
+            grp2 = grp.create_group("level_{}".format(i))
+            grp2.attrs["size"] = len(level)
+            save_pdh5_flat_index(grp2, level, compression=compression)
+            create_pdh5_dataset(
+                grp,
+                "codes_{}".format(i),
+                index.codes[i].astype(np.int32),
+                compression=compression,
+                resizable=True,
+            )
+    elif isinstance(index, pd.Index):
         grp.attrs["type"] = "Index"
-        grp.attrs["dtype"] = str(index.dtype)
-        if index.name is not None:
-            grp.attrs["name"] = index.name
-        data = grp.create_dataset(name="values", data=index.values, compression="gzip")
-    elif isinstance(index, (pd.Int64Index, pd.UInt64Index, pd.Float64Index)):
-        grp.attrs["type"] = type(index).__name__
         if index.name is not None:
             grp.attrs["name"] = index.name
-        data = grp.create_dataset(name="values", data=index.values, compression="gzip")
+        save_pdh5_flat_index(grp, index, compression=compression)
     else:
         raise ValueError("Unsupported index type '{}'.".format(type(index)))
 
 
-def save_pdh5_columns(f, df: pd.DataFrame, spinner=None):
-    columns = {x: get_dftype(df[x]) for x in df.columns}
-    f.attrs["columns"] = json.dumps(columns)
+def append_pdh5_index(f, df: pd.DataFrame, spinner=None, compression="gzip"):
+    """Appends the index of a dataframe to the index of an opened pdh5 file.
+
+    A RangeIndex stays a RangeIndex if the new index continues it. Otherwise, it is converted
+    into an explicit index before the new values are appended. A MultiIndex can only be appended
+    with a MultiIndex of the same number of levels. New level values are added to the end of the
+    stored levels.
+    """
+    size = int(f.attrs["size"])
+    index = df.index
+    grp = f["index"]
+    index_type = grp.attrs["type"]
+
+    if spinner is not None:
+        spinner.text = "appending index of type {}".format(type(index))
+
+    if (index_type == "MultiIndex") != isinstance(index, pd.MultiIndex):
+        raise ValueError(
+            "Unable to append an index of type '{}' to an index of type '{}'.".format(
+                type(index).__name__, index_type
+            )
+        )
+
+    if index_type == "MultiIndex":
+        nlevels = int(grp.attrs["nlevels"])
+        if index.nlevels != nlevels:
+            raise ValueError(
+                "Mismatched number of levels. Stored: {}. Got: {}.".format(
+                    nlevels, index.nlevels
+                )
+            )
+        for i, level in enumerate(index.levels):
+            grp2 = grp["level_{}".format(i)]
+            level_size = int(grp2.attrs["size"])
+            old_level = load_pdh5_flat_index(grp2, slice(0, level_size))
+            new_level = level[~level.isin(old_level)]
+            mapping = old_level.append(new_level).get_indexer(level)
+            codes = index.codes[i].astype(np.int32)
+            codes = np.where(codes < 0, codes, mapping.astype(np.int32)[codes])
+            if len(new_level) > 0:
+                append_pdh5_flat_index(
+                    grp2, new_level, level_size, compression=compression
+                )
+                grp2.attrs["size"] = level_size + len(new_level)
+            ds = grp["codes_{}".format(i)]
+            ds.resize(size + len(codes), axis=0)
+            ds[size:] = codes
+        return
+
+    if index_type == "RangeIndex":
+        old_index = pd.RangeIndex(
+            start=grp.attrs.get("start", None),
+            stop=grp.attrs.get("stop", None),
+            step=grp.attrs.get("step", None),
+        )
+        if isinstance(index, pd.RangeIndex) and (
+            len(index) == 0
+            or (
+                index.start == old_index.stop
+                and (index.step == old_index.step or len(index) == 1)
+            )
+        ):
+            grp.attrs["stop"] = old_index.stop + old_index.step * len(index)
+            return
+
+        grp.attrs["type"] = "Index"
+        save_pdh5_flat_index(grp, old_index, compression=compression)
+
+    append_pdh5_flat_index(grp, index, size, compression=compression)
+
+
+def save_special_cell(grp, key: str, item, dftype: str, compression="gzip"):
+    """Saves a non-null cell of dftype 'ndarray', 'Image' or 'SparseNdarray' into a pdh5 group.
+
+    It is the inverse of :func:`load_special_cell`.
+    """
+    if dftype == "ndarray":
+        create_pdh5_dataset(grp, key, item, compression=compression)
+    elif dftype == "SparseNdarray":
+        grp2 = grp.create_group(key)
+        grp2.attrs["dense_shape"] = json.dumps(item.dense_shape)
+        create_pdh5_dataset(grp2, "values", item.values, compression=compression)
+        create_pdh5_dataset(grp2, "indices", item.indices, compression=compression)
+    elif dftype == "Image":
+        grp2 = grp.create_group(key)
+        grp2.attrs["pixel_format"] = item.pixel_format
+        grp2.attrs["meta"] = json.dumps(item.meta)
+        create_pdh5_dataset(grp2, "image", item.image, compression=compression)
+
+
+def encode_pdh5_column(
+    s: pd.Series,
+    dftype: str,
+    like=None,
+    dict_threshold: float = 0.1,
+    image_codec: str = "raw",
+    vocabs: tp.Optional[dict] = None,
+) -> tp.Optional[dict]:
+    """Encodes a column into a pdh5 layout.
+
+    Parameters
+    ----------
+    s : pandas.Series
+        the column to encode
+    dftype : str
+        the dftype of the column. All-null columns can be encoded with any dftype that supports
+        nulls.
+    like : h5py.Group or h5py.Dataset, optional
+        the HDF5 object of an existing column with the same dftype. If provided, the column is
+        encoded with the same layout so that it can be appended to the existing column.
+    dict_threshold : float
+        a str column is dictionary-encoded if its number of distinct values is at most
+        `dict_threshold` times its number of rows. If `like` is a dictionary-encoded column and
+        its vocabulary would grow beyond `dict_threshold` times its new number of rows, the rows
+        are encoded in the 'vlen' layout instead, meaning that the column must be converted.
+    image_codec : str
+        the codec of an Image column. 'raw' means the pixels are stored as they are. 'png',
+        'jpeg' and 'webp', optionally followed by ':' and a quality, mean the images are encoded
+        with OpenCV. See :func:`parse_image_codec`. Ignored if `like` is provided.
+    vocabs : dict, optional
+        a cache mapping the HDF5 names of dictionary-encoded columns to their vocabularies, which
+        is read and updated when `like` is provided, so that repeated appends do not re-read the
+        whole vocabulary
+
+    Returns
+    -------
+    dict or None
+        None if dftype is 'none'. Otherwise, a dictionary with key 'layout' telling the layout.
+        If the layout is 'rows', key 'cells' holds the list of cells to be saved one by one.
+        Otherwise, key 'datasets' maps each dataset name to its content, key 'dtypes' maps some
+        dataset names to their HDF5 dtypes and key 'attrs' holds additional attributes. If the
+        layout is None, the column is a single dataset, the content of which is keyed by None.
+        Optional key 'stats_data' holds the values and the null mask over which statistics are
+        computed, when they differ from the datasets.
+    """
+    like_layout = None if like is None else like.attrs.get("layout", None)
+
+    if dftype == "none":
+        return None
+
+    if dftype == "category":
+        import h5py
+
+        if not isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype("category")
+        categories = s.cat.categories
+        codes = s.cat.codes.to_numpy().astype(
+            np.int32
+        )  # int32 leaves room for appending
+        if like is None:
+            new_categories = categories
+        else:
+            old_categories = pd.Index(load_categories(like))
+            new_categories = categories[~categories.isin(old_categories)]
+            if len(new_categories) > 0 and bool(like.attrs["ordered"]):
+                raise ValueError(
+                    "Unable to append new categories {} to ordered categorical column "
+                    "'{}'.".format(list(new_categories), s.name)
+                )
+            mapping = old_categories.append(new_categories).get_indexer(categories)
+            codes = np.where(codes < 0, codes, mapping.astype(np.int32)[codes])
+        values, categories_dtype = encode_categories(new_categories)
+        if like is not None and len(new_categories) == 0:
+            categories_dtype = like.attrs["categories_dtype"]
+        return {
+            "layout": "category",
+            "attrs": {
+                "ordered": (
+                    bool(s.cat.ordered) if like is None else bool(like.attrs["ordered"])
+                ),
+                "categories_dtype": categories_dtype,
+            },
+            "datasets": {"codes": codes, "categories": values},
+            "dtypes": (
+                {"categories": h5py.string_dtype()} if categories_dtype == "str" else {}
+            ),
+        }
+
+    if dftype in MASKED_DFTYPES:
+        if str(s.dtype) != dftype:
+            s = s.astype(dftype)
+        numpy_dtype = s.dtype.numpy_dtype
+        return {
+            "layout": "masked",
+            "attrs": {},
+            "datasets": {
+                "values": s.array.to_numpy(
+                    dtype=numpy_dtype, na_value=numpy_dtype.type(0)
+                ),
+                "isnull": s.isna().to_numpy(),
+            },
+            "dtypes": {},
+        }
+
+    if dftype in ("str", "string"):
+        # Nulls are recorded in a separate mask so that no sentinel string is needed. The
+        # strings are saved in h5py.string_dtype() dtype, which can deal with non-ascii
+        # characters but not with embedded NULLs.
+        import h5py
+
+        mask = s.isna().to_numpy()
+        data = s.to_numpy(dtype=object, copy=True)
+        data[mask] = ""
+        if like is None:
+            codes, vocab = pd.factorize(s.to_numpy(dtype=object))
+            use_dict = len(vocab) <= dict_threshold * len(s)
+        elif like_layout == "dict":
+            # new strings are added to the end of the vocabulary
+            codes, uniques = pd.factorize(s.to_numpy(dtype=object))
+            old_vocab = None if vocabs is None else vocabs.get(like.name, None)
+            if old_vocab is None:
+                old_vocab = pd.Index(like["vocab"].asstr()[()])
+            vocab = uniques[~pd.Index(uniques).isin(old_vocab)]
+            new_vocab = old_vocab.append(pd.Index(vocab))
+            mapping = new_vocab.get_indexer(uniques)
+            codes = np.where(codes < 0, codes, mapping[codes])
+            # the column falls back to 'vlen' once its cardinality is too high
+            use_dict = len(new_vocab) <= dict_threshold * (len(like["codes"]) + len(s))
+            if vocabs is not None:
+                vocabs[like.name] = new_vocab if use_dict else None
+        else:
+            use_dict = False
+        if use_dict:
+            # dictionary encoding for low-cardinality columns
+            n_vocab = len(vocab) if like is None else len(old_vocab) + len(vocab)
+            codes = codes.astype(np.uint16 if n_vocab <= 1 << 16 else np.uint32)
+            codes[mask] = 0
+            return {
+                "layout": "dict",
+                "attrs": {},
+                "datasets": {
+                    "codes": codes,
+                    "vocab": np.asarray(vocab, dtype=object),
+                    "isnull": mask,
+                },
+                "dtypes": {"vocab": h5py.string_dtype()},
+                "stats_data": (data, mask),
+            }
+        return {
+            "layout": "vlen",
+            "attrs": {},
+            "datasets": {"values": data, "isnull": mask},
+            "dtypes": {"values": h5py.string_dtype()},
+        }
+
+    if dftype in (
+        "bool",
+        "int8",
+        "uint8",
+        "int16",
+        "uint16",
+        "int32",
+        "uint32",
+        "float32",
+        "int64",
+        "uint64",
+        "float64",
+    ):
+        try:
+            data = s.astype(dftype).to_numpy()
+        except (ValueError, TypeError):
+            raise ValueError(
+                "Unable to represent nulls in column '{}' of dftype '{}'.".format(
+                    s.name, dftype
+                )
+            )
+        return {"layout": None, "attrs": {}, "datasets": {None: data}, "dtypes": {}}
+
+    if dftype == "json":
+        if like is None or like_layout == "buffer":
+            return {
+                "layout": "buffer",
+                "attrs": {},
+                "datasets": encode_json_cells(s.tolist()),
+                "dtypes": {},
+            }
+        # legacy layout with fixed-length strings
+        data = s.apply(lambda x: "\0" if isnull(x) else json.dumps(x)).to_numpy()
+        return {
+            "layout": None,
+            "attrs": {},
+            "datasets": {None: data.astype("S")},
+            "dtypes": {},
+        }
+
+    if dftype in ("Timestamp", "Timedelta"):
+        res = (
+            None
+            if like is not None and like_layout is None
+            else encode_datetimes(s, dftype)
+        )
+        if res is not None:
+            values, mask, tz = res
+            attrs = {}
+            if like is not None and mask.all():
+                tz = like.attrs.get("tz", None)
+            if tz is not None:
+                attrs["tz"] = tz
+            if like is None and s.dtype.kind in "Mm":  # restored on load
+                attrs["dtype"] = str(s.dtype)
+            return {
+                "layout": "int64",
+                "attrs": attrs,
+                "datasets": {"values": values, "isnull": mask},
+                "dtypes": {},
+            }
+
+        # legacy layout for mixed timezones or out-of-bound values
+        data = s.apply(lambda x: "\0" if isnull(x) else str(x)).to_numpy()
+        return {
+            "layout": None,
+            "attrs": {},
+            "datasets": {None: data.astype("S")},
+            "dtypes": {},
+        }
+
+    if dftype in ("ndarray", "Image", "SparseNdarray"):
+        data = s.tolist()
+        if like is not None:
+            image_codec = like.attrs.get("codec", "raw")
+        codec, quality = parse_image_codec(image_codec)
+        if dftype == "Image" and codec != "raw":
+            import h5py
+
+            return {
+                "layout": "encoded",
+                "attrs": {
+                    "codec": (
+                        codec if quality is None else "{}:{}".format(codec, quality)
+                    )
+                },
+                "datasets": encode_image_cells(data, codec, quality),
+                "dtypes": {
+                    "pixel_format": h5py.string_dtype(),
+                    "meta": h5py.string_dtype(),
+                },
+            }
+        if dftype == "SparseNdarray":
+            if like is None:
+                layout = get_sparse_layout(data)
+            else:
+                layout = like.attrs.get("layout", "rows")
+                rank = like["dense_shapes"].shape[1] if layout == "coo" else None
+                if layout == "coo" and any(
+                    not isnull(x) and len(x.dense_shape) != rank for x in data
+                ):
+                    raise ValueError(
+                        "Unable to append cells of rank other than {} to coo sparse column "
+                        "'{}'.".format(rank, s.name)
+                    )
+        elif dftype != "ndarray":
+            layout = "rows"
+        elif like is None:
+            layout = get_ndarray_layout(data)
+        else:
+            layout = like.attrs.get("layout", "rows")
+            if layout == "stacked" and get_ndarray_layout(data) == "ragged":
+                raise ValueError(
+                    "Unable to append cells of different shapes to stacked ndarray column "
+                    "'{}'.".format(s.name)
+                )
+        if layout == "stacked":
+            if like is None:
+                datasets = encode_stacked_ndarrays(data)
+            else:
+                ds = like["values"]
+                datasets = encode_stacked_ndarrays(data, ds.shape[1:], ds.dtype)
+        elif layout == "ragged":
+            if like is None:
+                datasets = encode_ragged_ndarrays(data)
+            else:
+                datasets = encode_ragged_ndarrays(
+                    data, like["shapes"].shape[1], like["values"].dtype
+                )
+        elif layout == "coo":
+            if like is None:
+                datasets = encode_sparse_cells(data)
+            else:
+                datasets = encode_sparse_cells(
+                    data,
+                    like["dense_shapes"].shape[1],
+                    like["values"].dtype,
+                    like["indices"].dtype,
+                )
+        else:
+            return {"layout": "rows", "cells": data}
+        return {"layout": layout, "attrs": {}, "datasets": datasets, "dtypes": {}}
+
+    data = s.apply(lambda x: type(x)).unique()
+    raise ValueError(
+        "Unable to save column '{}' with type list '{}'.".format(s.name, data)
+    )
+
+
+def write_pdh5_column(
+    f,
+    key: str,
+    dftype: str,
+    enc: dict,
+    compression="gzip",
+    executor: tp.Optional[Executor] = None,
+):
+    """Writes an encoded column into a new HDF5 object of a pdh5 file.
+
+    The datasets are created resizable so that rows can be appended later on. If `executor` is
+    provided, it is used to compress the chunks of the datasets concurrently. See
+    :func:`create_pdh5_dataset`.
+    """
+    layout = enc["layout"]
+    if layout is None:
+        create_pdh5_dataset(
+            f,
+            key,
+            enc["datasets"][None],
+            compression=compression,
+            resizable=True,
+            executor=executor,
+        )
+        return
+
+    grp = f.create_group(key)
+    if layout == "rows":
+        for i, item in enumerate(enc["cells"]):
+            if not isnull(item):
+                save_special_cell(grp, str(i), item, dftype, compression=compression)
+        return
+
+    grp.attrs["layout"] = layout
+    for k, v in enc["attrs"].items():
+        grp.attrs[k] = v
+    for name, data in enc["datasets"].items():
+        create_pdh5_dataset(
+            grp,
+            name,
+            data,
+            # encoded images do not compress any further
+            compression=(
+                None if layout == "encoded" and name == "values" else compression
+            ),
+            resizable=True,
+            executor=executor,
+            dtype=enc["dtypes"].get(name, None),
+        )
+
+
+def append_pdh5_column(
+    f, key: str, dftype: str, enc: dict, size: int, compression="gzip"
+):
+    """Appends an encoded column to the existing HDF5 object of a column of a pdh5 file.
+
+    Parameters
+    ----------
+    f : h5py.File
+        the pdh5 file opened for writing
+    key : str
+        the key of the HDF5 object of the column
+    dftype : str
+        the dftype of the column
+    enc : dict
+        the encoded rows to append, as returned by :func:`encode_pdh5_column` with the existing
+        HDF5 object as argument `like`
+    size : int
+        the number of rows of the column before appending. Anything stored beyond, e.g. left
+        over by an interrupted append, is overwritten.
+    compression : str or int or None
+        compression codec of new per-row datasets and of widened codes. See
+        :func:`compression_kwargs`.
+    """
+    obj = f[key]
+    layout = enc["layout"]
+
+    if layout == "rows":
+        for i, item in enumerate(enc["cells"]):
+            key2 = str(size + i)
+            if key2 in obj:
+                del obj[key2]
+            if not isnull(item):
+                save_special_cell(obj, key2, item, dftype, compression=compression)
+        return
+
+    if obj.attrs.get("layout", None) != layout:
+        raise ValueError(
+            "Unable to append layout '{}' to key '{}' of layout '{}'.".format(
+                layout, key, obj.attrs.get("layout", None)
+            )
+        )
+    for k, v in enc["attrs"].items():
+        if obj.attrs.get(k, None) != v:
+            raise ValueError(
+                "Mismatched attribute '{}' of key '{}': '{}' vs '{}'.".format(
+                    k, key, obj.attrs.get(k, None), v
+                )
+            )
+
+    datasets = enc["datasets"]
+    if layout is None:
+        datasets = {None: datasets[None]}
+    base = obj["offsets"][size] if "offsets" in datasets else None
+    for name, data in datasets.items():
+        ds = obj if name is None else obj[name]
+        if name == "codes" and data.dtype.itemsize > ds.dtype.itemsize:
+            # the vocabulary outgrew the codes, widen them
+            old_codes = ds[:size].astype(data.dtype)
+            discard_pdh5_digests(f, ds.name)
+            del obj[name]
+            ds = create_pdh5_dataset(
+                obj, name, old_codes, compression=compression, resizable=True
+            )
+        if ds.maxshape[0] is not None:
+            raise ValueError(
+                "Dataset '{}' is not resizable. Please re-save the file with save_pdh5() "
+                "first.".format(ds.name)
+            )
+        if ds.shape[1:] != data.shape[1:]:
+            raise ValueError(
+                "Mismatched shape of dataset '{}' of key '{}': {} vs {}.".format(
+                    name, key, ds.shape[1:], data.shape[1:]
+                )
+            )
+        if ds.dtype.kind == "S" and data.dtype.itemsize > ds.dtype.itemsize:
+            raise ValueError(
+                "Strings of dataset '{}' of key '{}' are too long to be appended. Please "
+                "re-save the file with save_pdh5().".format(name, key)
+            )
+        if name == "offsets":
+            data = data[1:] + base
+            start = size + 1
+        elif base is not None and name in ("values", "indices"):  # flat buffers
+            start = base
+        elif name in ("categories", "vocab"):  # new entries only
+            start = ds.shape[0]
+        else:
+            start = size
+        ds.resize(start + len(data), axis=0)
+        ds[start:] = data
+
+
+def get_compression_map(compression) -> tp.Tuple[dict, tp.Any]:
+    """Splits a compression option into a per-column mapping and a default codec."""
+    if isinstance(compression, dict):
+        return compression, "gzip"
+    return {}, compression
+
+
+def get_image_codec(image_codec, column) -> str:
+    """Returns the image codec of a column from a str or per-column dict option."""
+    if isinstance(image_codec, dict):
+        return image_codec.get(column, "raw")
+    return image_codec
+
+
+def get_stats_data(enc: tp.Optional[dict]) -> tp.Optional[tuple]:
+    """Returns the values and the null mask of an encoded column, if statistics apply to it.
+
+    Statistics apply to numeric, nullable numeric, Timestamp and str columns.
+    """
+    if enc is None:
+        return None
+    if "stats_data" in enc:
+        return enc["stats_data"]
+    layout = enc["layout"]
+    if layout is None:
+        values = enc["datasets"][None]
+        if values.dtype.kind == "f":
+            return values, np.isnan(values)
+        if values.dtype.kind in "biu":
+            return values, np.zeros(len(values), dtype=bool)
+        return None
+    if layout in ("masked", "int64", "vlen"):
+        return enc["datasets"]["values"], enc["datasets"]["isnull"]
+    return None
+
+
+def compute_chunk_stats(
+    values: np.ndarray, mask: np.ndarray, offset: int, stats_rows: int
+) -> dict:
+    """Computes the min/max/null-count statistics of new rows, per chunk of `stats_rows` rows.
+
+    The new rows start at row `offset`, so the first chunk may be partial. The min and max of a
+    chunk without any non-null value are meaningless.
+    """
+    n = len(values)
+    bounds = np.arange((offset // stats_rows + 1) * stats_rows, offset + n, stats_rows)
+    bounds = np.concatenate([[0], bounds - offset, [n]])
+    mins = []
+    maxs = []
+    null_counts = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        x = values[start:stop][~mask[start:stop]]
+        if len(x) > 0:
+            mins.append(x.min())
+            maxs.append(x.max())
+        else:
+            mins.append(values[:0].dtype.type() if values.dtype.kind != "O" else "")
+            maxs.append(mins[-1])
+        null_counts.append(stop - start - len(x))
+    return {
+        "min": np.array(mins, dtype=values.dtype),
+        "max": np.array(maxs, dtype=values.dtype),
+        "null_count": np.array(null_counts, dtype=np.int64),
+    }
+
+
+def update_pdh5_stats(f, key: str, enc: tp.Optional[dict], offset: int = 0):
+    """Updates the per-chunk statistics of a column of a pdh5 file after new rows are written.
+
+    The statistics are stored as datasets 'min', 'max' and 'null_count' of group
+    `f['stats'][key]`, with one entry per chunk of `f.attrs['stats_rows']` rows. Nothing is done
+    if the file has no statistics or the column does not support them.
+
+    Parameters
+    ----------
+    f : h5py.File
+        the opened pdh5 file
+    key : str
+        the key of the HDF5 object of the column
+    enc : dict
+        the encoded new rows, as returned by :func:`encode_pdh5_column`
+    offset : int
+        the row id of the first new row. If it is 0, the statistics are recomputed from scratch.
+    """
+    if "stats" not in f:
+        return
+    grp = f["stats"]
+    if offset == 0 and key in grp:
+        del grp[key]
+    res = get_stats_data(enc)
+    if res is None or (offset > 0 and key not in grp):
+        return
+    import h5py
+
+    values, mask = res
+    stats_rows = int(f.attrs["stats_rows"])
+    stats = compute_chunk_stats(values, mask, offset, stats_rows)
+    dtype = h5py.string_dtype() if values.dtype.kind == "O" else None
+
+    if offset == 0:
+        grp2 = grp.create_group(key)
+        for name, data in stats.items():
+            grp2.create_dataset(
+                name,
+                data=data,
+                dtype=dtype if name != "null_count" else None,
+                maxshape=(None,),
+                chunks=(1024,),  # one entry per stats chunk, so datasets stay small
+                **compression_kwargs("gzip"),
+            )
+        return
+
+    grp2 = grp[key]
+    first = offset // stats_rows
+    n_old = offset - first * stats_rows  # rows of the first chunk written before
+    if n_old > 0:  # merge with the partial chunk
+        old_null_count = int(grp2["null_count"][first])
+        if old_null_count < n_old:
+            old_min = grp2["min"][first]
+            old_max = grp2["max"][first]
+            if dtype is not None:
+                old_min = old_min.decode()
+                old_max = old_max.decode()
+            if stats["null_count"][0] < len(values[: stats_rows - n_old]):
+                stats["min"][0] = min(old_min, stats["min"][0])
+                stats["max"][0] = max(old_max, stats["max"][0])
+            else:
+                stats["min"][0] = old_min
+                stats["max"][0] = old_max
+        stats["null_count"][0] += old_null_count
+    for name, data in stats.items():
+        ds = grp2[name]
+        ds.resize(first + len(data), axis=0)
+        ds[first:] = data
+
+
+def get_checksum_algorithm() -> str:
+    """Returns the checksum algorithm of new pdh5 files: 'xxh64' if :mod:`xxhash` is available,
+    'crc32' otherwise."""
+    return "crc32" if import_xxhash() is None else "xxh64"
+
+
+def compute_digest(blocks, algorithm: str) -> int:
+    """Computes the digest of a sequence of byte blocks as an unsigned integer of 64 bits or
+    less."""
+    if algorithm == "xxh64":
+        xxhash = import_xxhash()
+        if xxhash is None:
+            raise ImportError("Package 'xxhash' is required for checksum 'xxh64'.")
+        h = xxhash.xxh64()
+        for block in blocks:
+            h.update(block)
+        return h.intdigest()
+    if algorithm == "crc32":
+        import zlib
+
+        crc = 0
+        for block in blocks:
+            crc = zlib.crc32(block, crc)
+        return crc
+    raise ValueError("Unknown checksum algorithm '{}'.".format(algorithm))
+
+
+def compute_checksum(blocks, algorithm: str) -> str:
+    """Computes the checksum of a sequence of byte blocks.
+
+    Returns
+    -------
+    str
+        the checksum as a hex digest prefixed by the algorithm and ':', e.g. 'crc32:1a2b3c4d'
+    """
+    digest = compute_digest(blocks, algorithm)
+    width = 8 if algorithm == "crc32" else 16
+    return "{}:{:0{}x}".format(algorithm, digest, width)
+
+
+def is_appendable_dataset(ds) -> bool:
+    """Checks if a dataset can be extended along the first axis, hence is chunked along it."""
+    return ds.chunks is not None and ds.maxshape[0] is None
+
+
+def compute_dataset_digests(
+    ds, algorithm: str, start: int = 0, fd: tp.Optional[int] = None
+) -> np.ndarray:
+    """Computes the digests of the stored bytes of an HDF5 dataset.
+
+    An appendable dataset gets one digest per chunk along the first axis, starting from the
+    `start`-th chunk, so that appending rows only requires hashing the last chunk onwards. The
+    raw chunks are hashed as stored, i.e. compressed, without decoding them. They are read with
+    :func:`os.pread` from file descriptor `fd` if provided, which lets several threads read
+    concurrently, or through HDF5 otherwise. Chunks of variable-length data only hold
+    references into the global heap of the file, so the elements of each chunk are read
+    through HDF5 and their bytes are hashed instead. Any other dataset gets a single digest, of
+    all its chunks or of its content if it is not chunked.
+
+    Returns
+    -------
+    numpy.ndarray
+        the digests as a 1D array of dtype uint64
+    """
+    dsid = ds.id
+
+    def read_chunk(coord):
+        info = dsid.get_chunk_info_by_coord(coord)
+        if info.byte_offset is None:  # never written
+            return b""
+        if fd is None:
+            return dsid.read_direct_chunk(coord)[1]
+        return os.pread(fd, info.size, info.byte_offset)
+
+    def iter_content(data):
+        if not ds.dtype.hasobject:
+            yield np.ascontiguousarray(data).tobytes()
+            return
+        for x in np.ravel(data):
+            if not isinstance(x, bytes):
+                x = x.tobytes() if isinstance(x, np.ndarray) else str(x).encode()
+            yield len(x).to_bytes(8, "little")
+            yield x
+
+    if ds.chunks is None:
+        digest = compute_digest(iter_content(ds[()]), algorithm)
+        return np.array([digest], dtype=np.uint64)
+
+    if is_appendable_dataset(ds):
+        n_rows = ds.chunks[0]
+        digests = []
+        for i in range(start, -(-ds.shape[0] // n_rows)):
+            if ds.dtype.hasobject:
+                blocks = iter_content(ds[i * n_rows : (i + 1) * n_rows])
+            else:
+                blocks = [read_chunk((i * n_rows,) + (0,) * (ds.ndim - 1))]
+            digests.append(compute_digest(blocks, algorithm))
+        return np.array(digests, dtype=np.uint64)
+
+    if ds.dtype.hasobject:
+        blocks = iter_content(ds[()])
+    else:
+        grid = [-(-x // y) for x, y in zip(ds.shape, ds.chunks)]
+        blocks = (
+            read_chunk(tuple(i * y for i, y in zip(idx, ds.chunks)))
+            for idx in np.ndindex(*grid)
+        )
+    return np.array([compute_digest(blocks, algorithm)], dtype=np.uint64)
+
+
+def list_pdh5_datasets(obj) -> list:
+    """Lists the datasets of an HDF5 object of a pdh5 file in order of their names."""
+    import h5py
+
+    if isinstance(obj, h5py.Dataset):
+        return [obj]
+    datasets = []
+    obj.visititems(
+        lambda name, x: datasets.append(x) if isinstance(x, h5py.Dataset) else None
+    )
+    datasets.sort(key=lambda x: x.name)
+    return datasets
+
+
+def combine_pdh5_digests(datasets, digests: list, algorithm: str) -> str:
+    """Combines the digests of the datasets of a column into the checksum of the column.
+
+    The name, shape and dtype of each dataset are hashed along with its digests.
+    """
+    blocks = (
+        block
+        for ds, x in zip(datasets, digests)
+        for block in (
+            "{}:{}:{}".format(ds.name, ds.shape, ds.dtype.str).encode(),
+            x.astype("<u8").tobytes(),
+        )
+    )
+    return compute_checksum(blocks, algorithm)
+
+
+def discard_pdh5_digests(f, name: str):
+    """Discards the recorded chunk digests of an HDF5 object of a pdh5 file that is about to be
+    deleted or rewritten, so that they are recomputed from scratch."""
+    key = "checksums/" + name.lstrip("/")
+    if key in f:
+        del f[key]
+
+
+def update_pdh5_checksums(f, enabled: bool = True):
+    """Records the checksum of every column of an opened pdh5 file in attribute 'checksum'.
+
+    The checksum of a column combines digests of its datasets. The digests of each appendable
+    dataset are kept per chunk in group 'checksums', under the path of the dataset, along with
+    the number of rows hashed. Only chunks from the last hashed one onwards are hashed again, so
+    updating after an append reads the appended bytes only. Any other dataset is written once
+    and keeps its digest in its own attribute 'digest'. See :func:`compute_dataset_digests`.
+
+    If `enabled` is False, existing checksums are removed instead, since they would be stale.
+    """
+    columns = json.loads(f.attrs["columns"])
+    algorithm = get_checksum_algorithm()
+    if "checksums" in f and (
+        not enabled or f["checksums"].attrs.get("algorithm", None) != algorithm
+    ):
+        del f["checksums"]
+        reset = True  # digests of another algorithm or about to be stale
+    else:
+        reset = "checksums" not in f
+    if enabled:
+        grp = f.require_group("checksums")
+        grp.attrs["algorithm"] = algorithm
+    f.flush()
+
+    for column, dftype in columns.items():
+        key = "column_" + text_filename(column)
+        if dftype == "none" or key not in f:
+            continue
+        obj = f[key]
+        datasets = list_pdh5_datasets(obj)
+        if not enabled:
+            if "checksum" in obj.attrs:
+                del obj.attrs["checksum"]
+            for ds in datasets:
+                if "digest" in ds.attrs:
+                    del ds.attrs["digest"]
+            continue
+
+        digests = []
+        for ds in datasets:
+            if not is_appendable_dataset(ds):
+                if reset or "digest" not in ds.attrs:
+                    ds.attrs["digest"] = compute_dataset_digests(ds, algorithm)[0]
+                digests.append(np.array([ds.attrs["digest"]], dtype=np.uint64))
+                continue
+            name = ds.name.lstrip("/")
+            n_rows = ds.chunks[0]
+            old = grp.get(name, None)
+            if old is not None and old.attrs.get("chunk_rows", None) == n_rows:
+                start = min(int(old.attrs["size"]), ds.shape[0]) // n_rows
+                start = min(start, len(old))
+                new = compute_dataset_digests(ds, algorithm, start=start)
+                old.resize(start + len(new), axis=0)
+                old[start:] = new
+            else:
+                if old is not None:
+                    del grp[name]
+                new = compute_dataset_digests(ds, algorithm)
+                old = grp.create_dataset(
+                    name,
+                    data=new,
+                    maxshape=(None,),
+                    chunks=(1024,),
+                    **compression_kwargs("gzip"),
+                )
+                old.attrs["chunk_rows"] = n_rows
+            old.attrs["size"] = ds.shape[0]
+            digests.append(old[()])
+        obj.attrs["checksum"] = combine_pdh5_digests(datasets, digests, algorithm)
+
+
+def save_pdh5_columns(
+    f,
+    df: pd.DataFrame,
+    spinner=None,
+    compression="gzip",
+    dftypes: tp.Optional[dict] = None,
+    stats_rows: tp.Optional[int] = 65536,
+    dict_threshold: float = 0.1,
+    n_threads: tp.Optional[int] = None,
+    image_codec: tp.Union[str, dict] = "raw",
+):
+    """Saves the columns of a dataframe into an opened pdh5 file.
+
+    If `n_threads` is more than 1, the columns are encoded concurrently in a thread pool, which
+    also compresses the chunks of gzip-compressed datasets. At most `n_threads` columns are
+    encoded ahead of the one being written, so that memory stays bounded. The datasets are
+    written by the calling thread only.
+    """
+    compression_map, default_compression = get_compression_map(compression)
+    if stats_rows:
+        f.attrs["stats_rows"] = stats_rows
+        f.create_group("stats")
+
+    def encode_column(column):
+        s = df[column]
+        dftype = get_pdh5_dftype(s) if dftypes is None else dftypes[column]
+        enc = encode_pdh5_column(
+            s,
+            dftype,
+            dict_threshold=dict_threshold,
+            image_codec=get_image_codec(image_codec, column),
+        )
+        return dftype, enc
+
+    if n_threads is not None and n_threads > 1:
+        executor = ThreadPoolExecutor(max_workers=n_threads)
+        scope = executor
+
+        def iter_results():
+            # encode at most n_threads columns ahead of the writer to bound memory
+            futures = deque()
+            for column in df.columns:
+                if len(futures) >= n_threads:
+                    yield futures.popleft().result()
+                futures.append(executor.submit(encode_column, column))
+            while futures:
+                yield futures.popleft().result()
+
+        results = iter_results()
+    else:
+        executor = None
+        scope = ctx.nullcontext()
+        results = map(encode_column, df.columns)
+
+    columns = {}
+    with scope:
+        for column, (dftype, enc) in zip(df.columns, results):
+            if spinner is not None:
+                spinner.text = "saving column '{}'".format(column)
+            columns[column] = dftype
+            if enc is None:
+                continue
+            key = "column_" + text_filename(column)
+            write_pdh5_column(
+                f,
+                key,
+                dftype,
+                enc,
+                compression=compression_map.get(column, default_compression),
+                executor=executor,
+            )
+            update_pdh5_stats(f, key, enc)
+    f.attrs["columns"] = json.dumps(columns)
+
+
+def append_pdh5_columns(
+    f,
+    df: pd.DataFrame,
+    spinner=None,
+    compression="gzip",
+    image_codec: tp.Union[str, dict] = "raw",
+    dict_threshold: float = 0.1,
+    vocabs: tp.Optional[dict] = None,
+):
+    """Appends the columns of a dataframe to the columns of an opened pdh5 file.
+
+    The dataframe must have the same columns as the file. The dftype of each column must match
+    the stored dftype, except that all-null columns can be appended to any column supporting
+    nulls and that a stored all-null column takes the dftype of the new rows. Argument
+    `image_codec` only applies to such materialised columns. Other Image columns keep their
+    stored codec. A dictionary-encoded str column whose vocabulary grows beyond
+    `dict_threshold` times its number of rows is rewritten in the 'vlen' layout. Argument
+    `vocabs` is a cache of vocabularies shared by repeated appends. See
+    :func:`encode_pdh5_column`.
+    """
+    size = int(f.attrs["size"])
+    columns = json.loads(f.attrs["columns"])
+    if set(columns) != set(df.columns):
+        raise ValueError(
+            "Mismatched columns. Stored: {}. Got: {}.".format(
+                list(columns), list(df.columns)
+            )
+        )
+    compression_map, default_compression = get_compression_map(compression)
+
+    for column in columns:
+        if spinner is not None:
+            spinner.text = "appending column '{}'".format(column)
+        key = "column_" + text_filename(column)
+        dftype = columns[column]
+        new_dftype = get_pdh5_dftype(df[column])
+        column_compression = compression_map.get(column, default_compression)
+
+        if dftype == "none":
+            if new_dftype == "none":
+                continue
+            # materialise the column, prefixing the new rows with nulls
+            s = (
+                df[column]
+                .set_axis(np.arange(size, size + len(df)))
+                .reindex(np.arange(size + len(df)))
+            )
+            dftype = get_pdh5_dftype(s)
+            if key in f:
+                discard_pdh5_digests(f, key)
+                del f[key]
+            enc = encode_pdh5_column(
+                s,
+                dftype,
+                dict_threshold=dict_threshold,
+                image_codec=get_image_codec(image_codec, column),
+            )
+            write_pdh5_column(f, key, dftype, enc, compression=column_compression)
+            update_pdh5_stats(f, key, enc)
+            columns[column] = dftype
+            continue
+
+        if new_dftype not in ("none", dftype):
+            raise ValueError(
+                "Mismatched dftype of column '{}'. Stored: '{}'. Got: '{}'.".format(
+                    column, dftype, new_dftype
+                )
+            )
+        enc = encode_pdh5_column(
+            df[column],
+            dftype,
+            like=f[key],
+            dict_threshold=dict_threshold,
+            vocabs=vocabs,
+        )
+        if enc["layout"] == "vlen" and f[key].attrs.get("layout", None) == "dict":
+            # too many distinct strings for dictionary encoding, rewrite the column
+            s = pd.concat(
+                [
+                    load_pdh5_column(f, column, dftype, slice(0, size)),
+                    df[column].reset_index(drop=True),
+                ],
+                ignore_index=True,
+            )
+            discard_pdh5_digests(f, key)
+            del f[key]
+            enc = encode_pdh5_column(s, dftype, dict_threshold=0)
+            write_pdh5_column(f, key, dftype, enc, compression=column_compression)
+            update_pdh5_stats(f, key, enc)
+            continue
+        append_pdh5_column(f, key, dftype, enc, size, compression=column_compression)
+        update_pdh5_stats(f, key, enc, size)
+
+    f.attrs["columns"] = json.dumps(columns)
+
+
+def save_pdh5_frame(
+    f,
+    df: pd.DataFrame,
+    spinner=None,
+    compression="gzip",
+    stats_rows: tp.Optional[int] = 65536,
+    dict_threshold: float = 0.1,
+    n_threads: tp.Optional[int] = None,
+    image_codec: tp.Union[str, dict] = "raw",
+    checksum: bool = True,
+):
+    """Saves a dataframe into an opened, empty HDF5 file. See :func:`save_pdh5`."""
+    save_pdh5_index(
+        f,
+        df,
+        spinner=spinner,
+        compression="gzip" if isinstance(compression, dict) else compression,
+    )
+    save_pdh5_columns(
+        f,
+        df,
+        spinner=spinner,
+        compression=compression,
+        stats_rows=stats_rows,
+        dict_threshold=dict_threshold,
+        n_threads=n_threads,
+        image_codec=image_codec,
+    )
+    if checksum:
+        update_pdh5_checksums(f)
+
+
+def build_pdh5_image(df: pd.DataFrame, spinner=None, **kwargs) -> bytes:
+    """Saves a dataframe into an in-memory pdh5 file, returning the file image.
+
+    Keyword arguments are passed as-is to :func:`save_pdh5_frame`.
+    """
+    import h5py
+
+    buf = BytesIO()
+    with h5py.File(buf, "w") as f:
+        save_pdh5_frame(f, df, spinner=spinner, **kwargs)
+    return buf.getvalue()
+
+
+def save_pdh5(
+    filepath: str,
+    df: pd.DataFrame,
+    file_mode: tp.Optional[int] = 0o664,
+    show_progress: bool = False,
+    compression: tp.Union[str, int, dict, None] = "gzip",
+    stats_rows: tp.Optional[int] = 65536,
+    dict_threshold: float = 0.1,
+    n_threads: tp.Optional[int] = None,
+    image_codec: tp.Union[str, dict] = "raw",
+    checksum: bool = True,
+    **kwargs
+):
+    """Saves a dataframe into a .pdh5 file.
+
+    Parameters
+    ----------
+    filepath : str
+        path to the file to be written to
+    df : pandas.DataFrame
+        the dataframe to write from
+    file_mode : int, optional
+        file mode of the newly written file
+    show_progress : bool
+        show a progress spinner in the terminal
+    compression : str or int or dict or None
+        The compression codec of the datasets. None or 'none' means no compression. 'gzip' means
+        gzip with the default level. An integer from 0 to 9 means gzip with that level. 'lzf'
+        means LZF. 'zstd', 'blosc', 'blosc:lz4' and 'blosc:zstd' require package
+        :mod:`hdf5plugin`. 'auto' picks a codec for each dataset depending on its data type. See
+        :func:`compression_kwargs` for more details. A dictionary mapping each column to its
+        codec can also be provided, in which case unlisted columns and the index use 'gzip'.
+    stats_rows : int, optional
+        number of rows per chunk of the min/max/null-count statistics recorded for numeric,
+        Timestamp and str columns. The statistics let :func:`load_pdh5_asyn` skip chunks that
+        cannot match its `filters` argument. If None or 0, no statistics are recorded.
+    dict_threshold : float
+        a str column is dictionary-encoded, i.e. stored as integer codes into a vocabulary of
+        its distinct strings, if its number of distinct strings is at most `dict_threshold` times
+        its number of rows. If 0, no str column is dictionary-encoded.
+    n_threads : int, optional
+        number of threads to encode columns and compress gzip chunks concurrently. The file is
+        still written by a single thread. If not provided or 1, everything happens in the
+        calling thread.
+    image_codec : str or dict
+        how the pixels of Image columns are stored. 'raw' means as they are, compressed like any
+        other dataset. 'png', 'jpeg' and 'webp', optionally followed by ':' and a quality like
+        'jpeg:90', mean that each image is encoded with OpenCV and the encoded bytes are stored
+        together with its pixel format and metadata. The quality is a JPEG or WebP quality from
+        0 to 100, with WebP being lossless above 100, or a PNG compression level from 0 to 9.
+        JPEG does not support pixel formats with an alpha channel. A dictionary mapping each
+        column to its codec can also be provided, in which case unlisted columns use 'raw'.
+    checksum : bool
+        whether or not to record a checksum of the stored bytes of each column, for
+        :func:`verify_pdh5` to detect corrupted or truncated files. The checksum is XXH64 if
+        :mod:`xxhash` is available or CRC32 otherwise.
+
+    Notes
+    -----
+    Files saved with codecs from :mod:`hdf5plugin` require :mod:`hdf5plugin` to be installed to
+    be loaded.
+    """
+    if show_progress:
+        spinner = HaloAuto("dfsaving '{}'".format(filepath), spinner="dots")
+        scope = spinner
+    else:
+        spinner = None
+        scope = ctx.nullcontext()
+    try:
+        import h5py
+
+        filepath2 = filepath + ".mttmp"
+        with scope, h5py.File(filepath2, "w") as f:
+            save_pdh5_frame(
+                f,
+                df,
+                spinner=spinner,
+                compression=compression,
+                stats_rows=stats_rows,
+                dict_threshold=dict_threshold,
+                n_threads=n_threads,
+                image_codec=image_codec,
+                checksum=checksum,
+            )
+        if file_mode is not None:  # chmod
+            os.chmod(filepath2, file_mode)
+        path.rename(filepath2, filepath, overwrite=True)
+        if show_progress:
+            spinner.succeed("dfsaved '{}'".format(filepath))
+    except:
+        if show_progress:
+            spinner.fail("failed to dfsave '{}'".format(filepath))
+        raise
+
+
+async def save_pdh5_asyn(
+    filepath: str,
+    df: pd.DataFrame,
+    file_mode: tp.Optional[int] = 0o664,
+    show_progress: bool = False,
+    compression: tp.Union[str, int, dict, None] = "gzip",
+    stats_rows: tp.Optional[int] = 65536,
+    dict_threshold: float = 0.1,
+    n_threads: tp.Optional[int] = None,
+    image_codec: tp.Union[str, dict] = "raw",
+    checksum: bool = True,
+    context_vars: dict = {},
+    file_write_delayed: bool = False,
+    make_dirs: bool = False,
+    **kwargs
+):
+    """An asyn function that saves a dataframe into a .pdh5 file.
+
+    Parameters
+    ----------
+    filepath : str
+        path to the file to be written to
+    df : pandas.DataFrame
+        the dataframe to write from
+    file_mode : int, optional
+        file mode of the newly written file
+    show_progress : bool
+        show a progress spinner in the terminal
+    compression : str or int or dict or None
+        the compression codec of the datasets. See :func:`save_pdh5`.
+    stats_rows : int, optional
+        number of rows per chunk of the column statistics. See :func:`save_pdh5`.
+    dict_threshold : float
+        threshold for dictionary-encoding str columns. See :func:`save_pdh5`.
+    n_threads : int, optional
+        number of threads to encode columns and compress gzip chunks concurrently. See
+        :func:`save_pdh5`.
+    image_codec : str or dict
+        how the pixels of Image columns are stored. See :func:`save_pdh5`.
+    checksum : bool
+        whether or not to record per-column checksums. See :func:`save_pdh5`.
+    context_vars : dict
+        a dictionary of context variables within which the function runs. It must include
+        `context_vars['async']` to tell whether to invoke the function asynchronously or not. In
+        asynchronous mode, the HDF5 image is built in memory in a worker thread and then written
+        using :func:`mt.aio.write_binary`. In synchronous mode, the file is written directly,
+        like :func:`save_pdh5`.
+    file_write_delayed : bool
+        Only valid in asynchronous mode. If True, wraps the file write task into a future and
+        returns the future. In all other cases, proceeds as usual.
+    make_dirs : bool
+        Whether or not to make the folders containing the path before writing to the file.
+
+    Returns
+    -------
+    asyncio.Future or int
+        either a future or the number of bytes written, depending on whether the file write
+        task is delayed or not
+    """
+    if not context_vars.get("async", False):
+        if make_dirs:
+            path.make_dirs(path.dirname(filepath))
+        save_pdh5(
+            filepath,
+            df,
+            file_mode=file_mode,
+            show_progress=show_progress,
+            compression=compression,
+            stats_rows=stats_rows,
+            dict_threshold=dict_threshold,
+            n_threads=n_threads,
+            image_codec=image_codec,
+            checksum=checksum,
+        )
+        return os.path.getsize(filepath)
+
+    import asyncio
+    import functools
+
+    if show_progress:
+        spinner = HaloAuto("dfsaving '{}'".format(filepath), spinner="dots")
+        scope = spinner
+    else:
+        spinner = None
+        scope = ctx.nullcontext()
+    with scope:
+        try:
+            func = functools.partial(
+                build_pdh5_image,
+                df,
+                spinner=spinner,
+                compression=compression,
+                stats_rows=stats_rows,
+                dict_threshold=dict_threshold,
+                n_threads=n_threads,
+                image_codec=image_codec,
+                checksum=checksum,
+            )
+            data = await asyncio.get_event_loop().run_in_executor(None, func)
+            res = await aio.write_binary(
+                filepath,
+                data,
+                file_mode=file_mode,
+                context_vars=context_vars,
+                file_write_delayed=file_write_delayed,
+                make_dirs=make_dirs,
+            )
+            if show_progress:
+                spinner.succeed("dfsaved '{}'".format(filepath))
+        except:
+            if show_progress:
+                spinner.fail("failed to dfsave '{}'".format(filepath))
+            raise
+    return res
+
+
+def append_pdh5(
+    filepath: str,
+    df: pd.DataFrame,
+    show_progress: bool = False,
+    compression: tp.Union[str, int, dict, None] = "gzip",
+    checksum: bool = True,
+    dict_threshold: float = 0.1,
+    **kwargs
+):
+    """Appends the rows of a dataframe to an existing .pdh5 file, in place.
+
+    Parameters
+    ----------
+    filepath : str
+        path to the file to be appended to
+    df : pandas.DataFrame
+        the dataframe to append from. It must have the same columns as the file and the dftype
+        of each column must match the stored dftype. All-null columns can be appended to any
+        column supporting nulls.
+    show_progress : bool
+        show a progress spinner in the terminal
+    compression : str or int or dict or None
+        The compression codec of newly created datasets. Existing datasets keep their codecs.
+        See :func:`save_pdh5`.
+    checksum : bool
+        whether or not to update the per-column checksums, which involves reading the appended
+        bytes of every column. If False, existing checksums are removed. See :func:`save_pdh5`.
+    dict_threshold : float
+        a dictionary-encoded str column whose number of distinct strings grows beyond
+        `dict_threshold` times its number of rows is rewritten without dictionary encoding.
+
+    Notes
+    -----
+    Only files saved by :func:`save_pdh5` from version 1.1 onwards have resizable datasets. Older
+    files must be re-saved before they can be appended to, otherwise a ValueError is raised
+    before anything is written. The number of rows of the file is
+    updated last so that an interrupted append leaves the file with its old content. Unlike
+    :func:`save_pdh5`, the file is modified in place.
+    """
+    if show_progress:
+        spinner = HaloAuto("dfappending '{}'".format(filepath), spinner="dots")
+        scope = spinner
+    else:
+        spinner = None
+        scope = ctx.nullcontext()
+    try:
+        import h5py
+
+        pdh5_file_pool.close(filepath)  # release any read-only handle of the file
+        with scope, h5py.File(filepath, "r+") as f:
+            if f.attrs.get("format", None) != "pdh5":
+                raise ValueError("Input file does not have 'pdh5' format.")
+            version = f.attrs.get("version", "1.0")
+            if version.split(".")[0] != "1":
+                raise ValueError("Unsupported pdh5 version '{}'.".format(version))
+            if version == "1.0":
+                raise ValueError(
+                    "Unable to append to pdh5 version 1.0, whose datasets are not resizable. "
+                    "Please re-save the file with save_pdh5() first."
+                )
+            append_pdh5_columns(
+                f,
+                df,
+                spinner=spinner,
+                compression=compression,
+                dict_threshold=dict_threshold,
+            )
+            append_pdh5_index(
+                f,
+                df,
+                spinner=spinner,
+                compression="gzip" if isinstance(compression, dict) else compression,
+            )
+            f.attrs["version"] = "1.1"
+            f.attrs["size"] = int(f.attrs["size"]) + len(df)
+            update_pdh5_checksums(f, enabled=checksum)
+        if show_progress:
+            spinner.succeed("dfappended '{}'".format(filepath))
+    except:
+        if show_progress:
+            spinner.fail("failed to dfappend '{}'".format(filepath))
+        raise
+
+
+class Pdh5Writer:
+    """Writes a .pdh5 file incrementally, chunk by chunk.
+
+    The chunks are written to a temporary '.mttmp' file, which is chmodded and renamed to the
+    final file when the writer is closed. The memory footprint is thus bounded by the chunk size
+    rather than the total number of rows. The datasets are chunked on disk by byte size, see
+    :func:`get_chunk_shape`, so their chunks do not depend on the number of rows of the first
+    chunk written. If the writer is used as a context manager and the body raises, the temporary
+    file is removed and the final file is not created.
+
+    Parameters
+    ----------
+    filepath : str
+        path to the file to be written to
+    schema : dict, optional
+        a dictionary mapping each column to its dftype. If provided, every chunk must have these
+        columns and the dftype of each column of each chunk must be either 'none' or the given
+        dftype. If not provided, the columns and their dftypes are inferred from the first chunk
+        using :func:`get_pdh5_dftype`. All-null columns of the first chunk are then
+        materialised by the first chunk with non-null values, which rewrites them.
+    file_mode : int, optional
+        file mode of the newly written file
+    show_progress : bool
+        show a progress spinner in the terminal
+    compression : str or int or dict or None
+        the compression codec of the datasets. See :func:`save_pdh5`.
+    stats_rows : int, optional
+        number of rows per chunk of the column statistics. See :func:`save_pdh5`.
+    dict_threshold : float
+        threshold for dictionary-encoding str columns. See :func:`save_pdh5`. A
+        dictionary-encoded column whose vocabulary outgrows the threshold in later chunks is
+        rewritten without dictionary encoding, once.
+    image_codec : str or dict
+        how the pixels of Image columns are stored. See :func:`save_pdh5`.
+    checksum : bool
+        whether or not to record per-column checksums when the writer is closed. See
+        :func:`save_pdh5`.
+
+    Attributes
+    ----------
+    size : int
+        the number of rows written so far
+
+    Examples
+    --------
+    >>> with Pdh5Writer('out.pdh5') as writer:
+    ...     for chunk in chunks:
+    ...         writer.write(chunk)
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        schema: tp.Optional[dict] = None,
+        file_mode: tp.Optional[int] = 0o664,
+        show_progress: bool = False,
+        compression: tp.Union[str, int, dict, None] = "gzip",
+        stats_rows: tp.Optional[int] = 65536,
+        dict_threshold: float = 0.1,
+        image_codec: tp.Union[str, dict] = "raw",
+        checksum: bool = True,
+    ):
+        import h5py
+
+        self.filepath = filepath
+        self.schema = None if schema is None else dict(schema)
+        self.file_mode = file_mode
+        self.compression = compression
+        self.stats_rows = stats_rows
+        self.dict_threshold = dict_threshold
+        self.image_codec = image_codec
+        self.checksum = checksum
+        self.vocabs = {}  # vocabularies of dictionary-encoded columns
+        if show_progress:
+            self.spinner = HaloAuto("dfwriting '{}'".format(filepath), spinner="dots")
+            self.spinner.start()
+        else:
+            self.spinner = None
+        self.tmp_filepath = filepath + ".mttmp"
+        self.f = h5py.File(self.tmp_filepath, "w")
+        self.size = 0
+        self.started = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, chunk: pd.DataFrame):
+        """Writes a chunk of rows to the file.
+
+        Parameters
+        ----------
+        chunk : pandas.DataFrame
+            the chunk to be written. Its index is appended to the index of the file. A RangeIndex
+            continuing the index written so far keeps the file index a RangeIndex. Chunks without
+            rows are skipped.
+        """
+        if self.f is None:
+            raise ValueError("Pdh5Writer of '{}' is closed.".format(self.filepath))
+        if self.schema is not None:
+            if set(chunk.columns) != set(self.schema):
+                raise ValueError(
+                    "Mismatched columns. Schema: {}. Got: {}.".format(
+                        list(self.schema), list(chunk.columns)
+                    )
+                )
+            for column, dftype in self.schema.items():
+                if len(chunk) == 0:  # nothing to validate
+                    break
+                dftype2 = get_pdh5_dftype(chunk[column])
+                if dftype2 not in ("none", dftype):
+                    raise ValueError(
+                        "Mismatched dftype of column '{}'. Schema: '{}'. Got: '{}'.".format(
+                            column, dftype, dftype2
+                        )
+                    )
+            chunk = chunk[list(self.schema)]
+        if len(chunk) == 0:
+            return
+
+        compression = self.compression
+        index_compression = "gzip" if isinstance(compression, dict) else compression
+        if not self.started:
+            save_pdh5_index(
+                self.f, chunk, spinner=self.spinner, compression=index_compression
+            )
+            save_pdh5_columns(
+                self.f,
+                chunk,
+                spinner=self.spinner,
+                compression=compression,
+                dftypes=self.schema,
+                stats_rows=self.stats_rows,
+                dict_threshold=self.dict_threshold,
+                image_codec=self.image_codec,
+            )
+            self.started = True
+        else:
+            append_pdh5_columns(
+                self.f,
+                chunk,
+                spinner=self.spinner,
+                compression=compression,
+                image_codec=self.image_codec,
+                dict_threshold=self.dict_threshold,
+                vocabs=self.vocabs,
+            )
+            append_pdh5_index(
+                self.f, chunk, spinner=self.spinner, compression=index_compression
+            )
+        self.size += len(chunk)
+        self.f.attrs["size"] = self.size
+
+    def close(self):
+        """Finishes writing, renaming the temporary file to the final file."""
+        if self.f is None:
+            return
+        try:
+            if not self.started:  # write an empty dataframe
+                columns = [] if self.schema is None else list(self.schema)
+                df = pd.DataFrame(columns=columns, dtype=object)
+                compression = self.compression
+                save_pdh5_index(
+                    self.f,
+                    df,
+                    compression=(
+                        "gzip" if isinstance(compression, dict) else compression
+                    ),
+                )
+                save_pdh5_columns(
+                    self.f,
+                    df,
+                    compression=compression,
+                    dftypes=self.schema,
+                    stats_rows=self.stats_rows,
+                    dict_threshold=self.dict_threshold,
+                    image_codec=self.image_codec,
+                )
+            if self.checksum:
+                update_pdh5_checksums(self.f)
+            self.f.close()
+            self.f = None
+            if self.file_mode is not None:  # chmod
+                os.chmod(self.tmp_filepath, self.file_mode)
+            path.rename(self.tmp_filepath, self.filepath, overwrite=True)
+            if self.spinner is not None:
+                self.spinner.succeed("dfwritten '{}'".format(self.filepath))
+        except:
+            self.abort()
+            raise
+
+    def abort(self):
+        """Stops writing, removing the temporary file without creating the final file."""
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+        if path.exists(self.tmp_filepath):
+            path.remove(self.tmp_filepath)
+        if self.spinner is not None:
+            self.spinner.fail("failed to dfwrite '{}'".format(self.filepath))
+            self.spinner = None
+
+
+def load_pdh5_index(
+    f, spinner=None, max_rows: tp.Optional[int] = None, rows=None
+) -> pd.DataFrame:
+    if f.attrs["format"] != "pdh5":
+        raise ValueError("Input file does not have 'pdh5' format.")
+    version = f.attrs.get("version", "1.0")
+    if version.split(".")[0] != "1":
+        raise ValueError("Unsupported pdh5 version '{}'.".format(version))
+    size = f.attrs["size"]
+
+    grp = f.require_group("index")
+
+    index_type = grp.attrs["type"]
+    if spinner is not None:
+        spinner.text = "loading index of type {}".format(index_type)
+
+    if index_type == "RangeIndex":
+        start = grp.attrs.get("start", None)
+        stop = grp.attrs.get("stop", None)
+        step = grp.attrs.get("step", None)
+        name = grp.attrs.get("name", None)
+        index = pd.RangeIndex(start=start, stop=stop, step=step, name=name)
+        if rows is not None or max_rows is not None:
+            index = index[get_row_selection(size, rows=rows, max_rows=max_rows)]
+    elif index_type == "MultiIndex":
+        sel = get_row_selection(size, rows=rows, max_rows=max_rows)
+        nlevels = int(grp.attrs["nlevels"])
+        levels = []
+        codes = []
+        for i in range(nlevels):
+            grp2 = grp["level_{}".format(i)]
+            levels.append(load_pdh5_flat_index(grp2, slice(0, int(grp2.attrs["size"]))))
+            codes.append(read_rows(grp["codes_{}".format(i)], sel))
+        index = pd.MultiIndex(
+            levels=levels,
+            codes=codes,
+            names=json.loads(grp.attrs["names"]),
+            verify_integrity=False,
+        )
+    elif index_type in ("Int64Index", "UInt64Index", "Float64Index", "Index"):
+        # Int64Index, UInt64Index and Float64Index are legacy types of pandas < 2
+        name = grp.attrs.get("name", None)
+        sel = get_row_selection(size, rows=rows, max_rows=max_rows)
+        index = load_pdh5_flat_index(grp, sel, name=name)
+    else:
+        raise ValueError("Unsupported index type '{}'.".format(index_type))
+
+    return pd.DataFrame(index=index)
+
+
+def load_pdh5_column(
+    f,
+    column: str,
+    dftype: str,
+    sel: tp.Union[slice, np.ndarray],
+    file_read_delayed: bool = False,
+    filepath: tp.Optional[str] = None,
+    key: tp.Optional[str] = None,
+    str_as_category: bool = False,
+    n_threads: tp.Optional[int] = None,
+) -> pd.Series:
+    """Loads the selected rows of a column of a pdh5 file, returning a series without index.
+
+    The column is read from HDF5 object `f[key]`. If `key` is not provided, it is derived from
+    the column name. If `str_as_category` is True, a str column is returned as a categorical
+    series. The categories of a dictionary-encoded column are then its whole vocabulary. If
+    `n_threads` is more than 1, the images of an encoded Image column are decoded concurrently.
+    """
+    row_ids = get_row_ids(sel)
+    size = len(row_ids)
+    if key is None:
+        key = "column_" + text_filename(column)
+    if dftype == "none":
+        return pd.Series([None] * size, dtype=object, name=column)
+    if dftype == "category":
+        grp = f[key]
+        values = pd.Categorical.from_codes(
+            read_rows(grp["codes"], sel),
+            categories=load_categories(grp),
+            ordered=bool(grp.attrs["ordered"]),
+        )
+        return pd.Series(values, name=column)
+    if dftype in MASKED_DFTYPES:
+        grp = f[key]
+        dtype = pd.api.types.pandas_dtype(dftype)
+        values = dtype.construct_array_type()(
+            read_rows(grp["values"], sel), read_rows(grp["isnull"], sel)
+        )
+        return pd.Series(values, name=column)
+    if dftype in ("str", "string") and f[key].attrs.get("layout", None) == "dict":
+        grp = f[key]
+        codes = read_rows(grp["codes"], sel).astype(np.int64)
+        mask = read_rows(grp["isnull"], sel)
+        vocab = grp["vocab"].asstr()[()]
+        if str_as_category:
+            codes[mask] = -1
+            values = pd.Categorical.from_codes(codes, categories=vocab)
+            return pd.Series(values, name=column)
+        data = vocab.take(codes) if len(vocab) > 0 else np.full(size, "", dtype=object)
+        data[mask] = None
+        if dftype == "string":
+            data = pd.array(data, dtype="string")
+        return pd.Series(data, name=column)
+    if dftype == "string":
+        grp = f[key]
+        data = read_rows(grp["values"].asstr(), sel)
+        data[read_rows(grp["isnull"], sel)] = None
+        s = pd.Series(pd.array(data, dtype="string"), name=column)
+        return s.astype("category") if str_as_category else s
+    if dftype == "str":
+        if f[key].attrs.get("layout", None) == "vlen":
+            grp = f[key]
+            data = read_rows(grp["values"].asstr(), sel)
+            data[read_rows(grp["isnull"], sel)] = None
+            s = pd.Series(data, name=column)
+            return s.astype("category") if str_as_category else s
+        # legacy layout with a sentinel string for nulls
+        s = pd.Series(read_rows(f[key], sel), name=column).apply(
+            lambda x: (
+                None
+                if x in (b"", b"None_NaT_NaN")
+                else x.decode() if isinstance(x, bytes) else x
+            )
+        )
+        return s.astype("category") if str_as_category else s
+    if dftype in (
+        "bool",
+        "int8",
+        "uint8",
+        "int16",
+        "uint16",
+        "int32",
+        "uint32",
+        "float32",
+        "int64",
+        "uint64",
+        "float64",
+    ):
+        return pd.Series(read_rows(f[key], sel), name=column)
+    if dftype == "json":
+        if file_read_delayed and f[key].attrs.get("layout", None) == "buffer":
+            col = Pdh5Column(filepath, column)
+            mask = read_rows(f[key]["isnull"], sel)
+            data = [
+                None if mask[j] else Pdh5Cell(col, i) for j, i in enumerate(row_ids)
+            ]
+        elif file_read_delayed:
+            col = Pdh5Column(filepath, column)
+            data = [Pdh5Cell(col, i) for i in row_ids]
+        elif f[key].attrs.get("layout", None) == "buffer":
+            data = load_json_cells(f[key], sel)
+        else:  # legacy layout with fixed-length strings
+            data = [None if x == b"" else json.loads(x) for x in read_rows(f[key], sel)]
+        return pd.Series(data, dtype=object, name=column)
+    if (
+        dftype in ("Timestamp", "Timedelta")
+        and f[key].attrs.get("layout", None) == "int64"
+    ):
+        grp = f[key]
+        values = decode_datetimes(
+            read_rows(grp["values"], sel),
+            read_rows(grp["isnull"], sel),
+            dftype,
+            tz=grp.attrs.get("tz", None),
+            dtype=grp.attrs.get("dtype", None),
+        )
+        return pd.Series(values, name=column)
+    if dftype == "Timestamp":
+        return pd.Series(read_rows(f[key], sel), name=column).apply(
+            lambda x: pd.NaT if x == b"" else pd.Timestamp(x.decode())
+        )
+    if dftype == "Timedelta":
+        return pd.Series(read_rows(f[key], sel), name=column).apply(
+            lambda x: pd.NaT if x == b"" else pd.Timedelta(x.decode())
+        )
+    if dftype in ("ndarray", "Image", "SparseNdarray"):
+        data = [None] * size
+        grp = f.require_group(key)
+        if file_read_delayed:
+            col = Pdh5Column(filepath, column)
+        layout = grp.attrs.get("layout", "rows")
+        if layout != "rows":
+            if file_read_delayed:
+                mask = read_rows(grp["isnull"], sel)
+                data = [
+                    None if mask[j] else Pdh5Cell(col, i) for j, i in enumerate(row_ids)
+                ]
+            elif layout == "encoded":
+                data = load_image_cells(grp, sel, n_threads=n_threads)
+            elif layout == "coo":
+                data = load_sparse_cells(grp, sel)
+            else:
+                data = load_ndarray_cells(grp, layout, sel)
+        elif size * 2 < len(grp):  # direct key lookups
+            for j, i in enumerate(row_ids):
+                key = str(i)
+                if key in grp:
+                    data[j] = (
+                        Pdh5Cell(col, i)
+                        if file_read_delayed
+                        else load_special_cell(grp, key, dftype)
+                    )
+        else:  # scan all keys
+            for key in grp.keys():
+                i = int(key)
+                if isinstance(sel, slice):
+                    j = i - sel.start if sel.start <= i < sel.stop else -1
+                else:
+                    j = np.searchsorted(sel, i)
+                    if j >= size or sel[j] != i:
+                        j = -1
+                if j >= 0:
+                    data[j] = (
+                        Pdh5Cell(col, i)
+                        if file_read_delayed
+                        else load_special_cell(grp, key, dftype)
+                    )
+        return pd.Series(data, dtype=object, name=column)
+    raise ValueError(
+        "Unable to load column '{}' with dftype '{}'.".format(column, dftype)
+    )
+
+
+def load_pdh5_columns(
+    f,
+    df: pd.DataFrame,
+    spinner=None,
+    file_read_delayed: bool = False,
+    max_rows: tp.Optional[int] = None,
+    columns: tp.Optional[tp.List[str]] = None,
+    rows=None,
+    filepath: tp.Optional[str] = None,
+    n_threads: tp.Optional[int] = None,
+    executor: tp.Optional[Executor] = None,
+    str_as_category: bool = False,
+) -> pd.DataFrame:
+    """Loads the columns of a pdh5 file into a dataframe.
+
+    The columns are decoded independently, possibly concurrently, and the dataframe is assembled
+    once at the end.
+
+    Parameters
+    ----------
+    f : h5py.File
+        the opened pdh5 file
+    df : pandas.DataFrame
+        the dataframe holding the loaded index, as returned by :func:`load_pdh5_index` with the
+        same `max_rows` and `rows` arguments
+    spinner : Halo, optional
+        spinner for tracking purposes
+    file_read_delayed : bool
+        whether or not some columns are proxied for reading later
+    max_rows : int, optional
+        limit the maximum number of rows to be read
+    columns : list, optional
+        list of columns to be read. If not provided, all columns are read.
+    rows : slice or numpy.ndarray or list, optional
+        rows to be read. See :func:`get_row_selection`.
+    filepath : str, optional
+        path to the file, used by delayed columns to reopen the file. Default is `f.filename`.
+    n_threads : int, optional
+        number of threads to decode columns concurrently. This is best-effort: h5py holds a
+        global lock while reading, including while decompressing chunks, so the threads only
+        overlap in decoding the read data, e.g. strings, JSON objects or images. If not provided
+        or 1, columns are decoded one after another. Ignored if `executor` is provided.
+    executor : concurrent.futures.Executor, optional
+        an executor to decode columns concurrently
+    str_as_category : bool
+        whether or not to load str columns as categorical columns
+
+    Returns
+    -------
+    pandas.DataFrame
+        a new dataframe with the index of `df` and the loaded columns
+    """
+    if filepath is None:
+        filepath = f.filename
+    all_columns = json.loads(f.attrs["columns"])
+    if columns is None:
+        columns = all_columns
+    else:
+        missing_columns = [x for x in columns if x not in all_columns]
+        if missing_columns:
+            raise ValueError(
+                "Columns {} do not exist in the pdh5 file.".format(missing_columns)
+            )
+        columns = {x: all_columns[x] for x in columns}
+    sel = get_row_selection(f.attrs["size"], rows=rows, max_rows=max_rows)
+
+    def load_column(column):
+        if spinner is not None:
+            spinner.text = "loading column '{}'".format(column)
+        s = load_pdh5_column(
+            f,
+            column,
+            columns[column],
+            sel,
+            file_read_delayed=file_read_delayed,
+            filepath=filepath,
+            str_as_category=str_as_category,
+        )
+        return s
+
+    if executor is not None:
+        l_series = list(executor.map(load_column, columns))
+    elif n_threads is not None and n_threads > 1:
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            l_series = list(executor.map(load_column, columns))
+    else:
+        l_series = [load_column(column) for column in columns]
+
+    df2 = pd.DataFrame(
+        {s.name: s for s in l_series},
+        index=pd.RangeIndex(len(df.index)),
+        columns=list(columns),
+    )
+    df2.index = df.index
+    return df2
+
+
+FILTER_OPS = ("=", "==", "!=", "<", "<=", ">", ">=", "in", "not in")
+
+
+def normalise_filters(filters) -> tp.List[tp.List[tuple]]:
+    """Normalises parquet-style filters into a disjunction of conjunctions of predicates.
+
+    A list of `(column, op, value)` tuples means a conjunction. A list of such lists means a
+    disjunction of conjunctions.
+    """
+    if not filters:
+        return []
+    if all(isinstance(x, tuple) for x in filters):
+        filters = [filters]
+    res = []
+    for conjunction in filters:
+        conjunction = [tuple(x) for x in conjunction]
+        for predicate in conjunction:
+            if len(predicate) != 3 or predicate[1] not in FILTER_OPS:
+                raise ValueError(
+                    "Invalid filter predicate {}. Expected (column, op, value) with op in "
+                    "{}.".format(predicate, FILTER_OPS)
+                )
+        res.append(conjunction)
+    return res
+
+
+def normalise_timestamp(value, tz=None) -> pd.Timestamp:
+    """Normalises a value compared against a Timestamp column of timezone `tz`.
+
+    A naive value compared against a tz-aware column is localised to the timezone of the column.
+    A tz-aware value compared against a naive column is converted to UTC and made naive, the
+    way naive columns are stored.
+    """
+    value = pd.Timestamp(value)
+    if tz is not None and value.tzinfo is None:
+        return value.tz_localize(tz)
+    if tz is None and value.tzinfo is not None:
+        return value.tz_convert("UTC").tz_localize(None)
+    return value
+
+
+def normalise_filter_value(f, column: str, dftype: str, op: str, value):
+    """Normalises the value of a filter predicate on a column of a pdh5 file.
+
+    The value is used as-is, except for Timestamp columns. See :func:`normalise_timestamp`.
+    """
+    if dftype != "Timestamp" or value is None:
+        return value
+    key = "column_" + text_filename(column)
+    tz = f[key].attrs.get("tz", None) if key in f else None
+    if op in ("in", "not in"):
+        return [normalise_timestamp(x, tz) for x in value]
+    return normalise_timestamp(value, tz)
+
+
+def match_chunk_stats(stats: dict, dftype: str, op: str, value) -> np.ndarray:
+    """Tells which chunks of a column may contain rows matching a predicate, given their stats.
+
+    Parameters
+    ----------
+    stats : dict
+        a dictionary with keys 'min', 'max', 'null_count' and 'n_rows' mapping to arrays with one
+        entry per chunk
+    dftype : str
+        the dftype of the column
+    op : str
+        the comparison operator
+    value : object
+        the value to compare against, or a collection of values if `op` is 'in' or 'not in'
+
+    Returns
+    -------
+    numpy.ndarray
+        a boolean array with one entry per chunk. False means that no row of the chunk can match.
+    """
+    values = list(value) if op in ("in", "not in") else [value]
+    if dftype == "Timestamp":
+        values = [pd.Timestamp(x).value for x in values]
+    lo = stats["min"]
+    hi = stats["max"]
+    res = stats["null_count"] < stats["n_rows"]  # nulls never match
+    try:
+        if op in ("=", "=="):
+            return res & (lo <= values[0]) & (hi >= values[0])
+        if op == "!=":
+            return res & ~((lo == values[0]) & (hi == values[0]))
+        if op == "<":
+            return res & (lo < values[0])
+        if op == "<=":
+            return res & (lo <= values[0])
+        if op == ">":
+            return res & (hi > values[0])
+        if op == ">=":
+            return res & (hi >= values[0])
+        if op == "in":
+            mask = np.zeros(len(lo), dtype=bool)
+            for x in values:
+                mask |= (lo <= x) & (hi >= x)
+            return res & mask
+        # not in
+        mask = np.zeros(len(lo), dtype=bool)
+        for x in values:
+            mask |= (lo == x) & (hi == x)
+        return res & ~mask
+    except TypeError:  # incomparable values, cannot prune
+        return np.ones(len(lo), dtype=bool)
+
+
+def match_rows(s: pd.Series, op: str, value) -> np.ndarray:
+    """Evaluates a predicate on the values of a column. Nulls never match."""
+    if op in ("=", "=="):
+        res = s == value
+    elif op == "!=":
+        res = s != value
+    elif op == "<":
+        res = s < value
+    elif op == "<=":
+        res = s <= value
+    elif op == ">":
+        res = s > value
+    elif op == ">=":
+        res = s >= value
+    elif op == "in":
+        res = s.isin(list(value))
+    else:
+        res = ~s.isin(list(value))
+    return (res & s.notna()).fillna(False).to_numpy(dtype=bool)
+
+
+def get_filtered_rows(f, filters, rows=None, spinner=None) -> np.ndarray:
+    """Determines the rows of a pdh5 file that match parquet-style filters.
+
+    Chunks whose statistics cannot match the filters are skipped without being read. The
+    columns involved in the filters are then read for the surviving rows only, and the filters
+    are evaluated on them.
+
+    Parameters
+    ----------
+    f : h5py.File
+        the opened pdh5 file
+    filters : list
+        parquet-style filters in disjunctive normal form. See :func:`load_pdh5_asyn`.
+    rows : slice or numpy.ndarray or list, optional
+        rows to be filtered. See :func:`get_row_selection`. If not provided, all rows are
+        filtered.
+    spinner : Halo, optional
+        spinner for tracking purposes
+
+    Returns
+    -------
+    numpy.ndarray
+        the strictly increasing int64 array of ids of the matching rows
+    """
+    filters = normalise_filters(filters)
+    size = int(f.attrs["size"])
+    sel = get_row_selection(size, rows=rows)
+    all_columns = json.loads(f.attrs["columns"])
+    for conjunction in filters:
+        for column, op, value in conjunction:
+            if column not in all_columns:
+                raise ValueError(
+                    "Filtered column '{}' does not exist in the pdh5 file.".format(
+                        column
+                    )
+                )
+    filters = [
+        [
+            (x, op, normalise_filter_value(f, x, all_columns[x], op, value))
+            for x, op, value in conjunction
+        ]
+        for conjunction in filters
+    ]
+    if not filters:
+        return np.asarray(get_row_ids(sel), dtype=np.int64)
 
-    for column in columns:
+    # prune chunks using the statistics
+    stats_rows = int(f.attrs.get("stats_rows", 0))
+    if stats_rows > 0 and "stats" in f and size > 0:
         if spinner is not None:
-            spinner.text = "saving column '{}'".format(column)
-        key = "column_" + text_filename(column)
-        dftype = columns[column]
-        if dftype == "none":
-            pass
-        elif dftype == "str":
-            # If we save in 'S' dtype, it cannot deal with non-ascii characters.
-            # If we save in h5py.string_dtype() dtype, we get "VLEN strings do not support embedded NULLs".
-            # What should we do?
-            import h5py
-
-            data = (
-                df[column]
-                .apply(lambda x: "None_NaT_NaN" if isnull(x) else x)
-                .to_numpy()
-                .astype(h5py.string_dtype())
-            )
-            f.create_dataset(key, data=data, compression="gzip")
-        elif dftype in (
-            "bool",
-            "int8",
-            "uint8",
-            "int16",
-            "uint16",
-            "int32",
-            "uint32",
-            "float32",
-            "int64",
-            "uint64",
-            "float64",
-        ):
-            data = df[column].astype(dftype).to_numpy()
-            f.create_dataset(key, data=data, compression="gzip")
-        elif dftype == "json":
-            data = (
-                df[column]
-                .apply(lambda x: "\0" if isnull(x) else json.dumps(x))
-                .to_numpy()
-                .astype("S")
-            )
-            f.create_dataset(key, data=data, compression="gzip")
-        elif dftype in ("Timestamp", "Timedelta"):
-            data = (
-                df[column]
-                .apply(lambda x: "\0" if isnull(x) else str(x))
-                .to_numpy()
-                .astype("S")
-            )
-            f.create_dataset(key, data=data, compression="gzip")
-        elif dftype in ("ndarray", "Image", "SparseNdarray"):
-            data = df[column].tolist()
-            grp = f.create_group(key)
-            for i, item in enumerate(data):
-                if isnull(item):
+            spinner.text = "pruning chunks using statistics"
+        n_chunks = (size + stats_rows - 1) // stats_rows
+        n_rows = np.full(n_chunks, stats_rows, dtype=np.int64)
+        n_rows[-1] = size - (n_chunks - 1) * stats_rows
+        cache = {}
+        chunk_mask = np.zeros(n_chunks, dtype=bool)
+        for conjunction in filters:
+            mask = np.ones(n_chunks, dtype=bool)
+            for column, op, value in conjunction:
+                key = "column_" + text_filename(column)
+                if key not in f["stats"]:
                     continue
-                key = str(i)
-                if dftype == "ndarray":
-                    grp.create_dataset(key, data=item, compression="gzip")
-                elif dftype == "SparseNdarray":
-                    grp2 = grp.create_group(key)
-                    grp2.attrs["dense_shape"] = json.dumps(item.dense_shape)
-                    grp2.create_dataset("values", data=item.values, compression="gzip")
-                    grp2.create_dataset(
-                        "indices", data=item.indices, compression="gzip"
-                    )
-                elif dftype == "Image":
-                    grp2 = grp.create_group(key)
-                    grp2.attrs["pixel_format"] = item.pixel_format
-                    grp2.attrs["meta"] = json.dumps(item.meta)
-                    grp2.create_dataset("image", data=item.image, compression="gzip")
+                if key not in cache:
+                    grp = f["stats"][key]
+                    stats = {"n_rows": n_rows}
+                    for name in ("min", "max", "null_count"):
+                        ds = grp[name]
+                        if ds.dtype.kind == "O":
+                            ds = ds.asstr()
+                        stats[name] = ds[:n_chunks]
+                    cache[key] = stats
+                mask &= match_chunk_stats(cache[key], all_columns[column], op, value)
+            chunk_mask |= mask
+        if isinstance(sel, slice):
+            starts = np.flatnonzero(chunk_mask) * stats_rows
+            stops = np.minimum(starts + stats_rows, size)
+            starts = np.maximum(starts, sel.start)
+            stops = np.minimum(stops, sel.stop)
+            ids = [np.arange(a, b) for a, b in zip(starts, stops) if a < b]
+            ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.int64)
         else:
-            data = df[column].apply(lambda x: type(x)).unique()
-            raise ValueError(
-                "Unable to save column '{}' with type list '{}'.".format(column, data)
-            )
+            ids = sel[chunk_mask[sel // stats_rows]]
+    else:
+        ids = np.asarray(get_row_ids(sel), dtype=np.int64)
 
+    # evaluate the filters on the surviving rows
+    ids = ids.astype(np.int64)
+    if len(ids) == 0:
+        return ids
+    cache = {}
+    mask = np.zeros(len(ids), dtype=bool)
+    for conjunction in filters:
+        mask2 = np.ones(len(ids), dtype=bool)
+        for column, op, value in conjunction:
+            if column not in cache:
+                if spinner is not None:
+                    spinner.text = "filtering column '{}'".format(column)
+                cache[column] = load_pdh5_column(f, column, all_columns[column], ids)
+            mask2 &= match_rows(cache[column], op, value)
+        mask |= mask2
+    return ids[mask]
 
-def save_pdh5(
+
+async def load_pdh5_asyn(
     filepath: str,
-    df: pd.DataFrame,
-    file_mode: tp.Optional[int] = 0o664,
     show_progress: bool = False,
+    file_read_delayed: bool = False,
+    max_rows: tp.Optional[int] = None,
+    columns: tp.Optional[tp.List[str]] = None,
+    rows=None,
+    io_mode: tp.Optional[str] = None,
+    n_threads: tp.Optional[int] = None,
+    executor: tp.Optional[Executor] = None,
+    str_as_category: bool = False,
+    filters: tp.Optional[list] = None,
+    context_vars: dict = {},
     **kwargs
-):
-    """Saves a dataframe into a .pdh5 file.
+) -> pd.DataFrame:
+    """Loads the dataframe of a .pdh5 file.
 
     Parameters
     ----------
     filepath : str
-        path to the file to be written to
-    df : pandas.DataFrame
-        the dataframe to write from
-    file_mode : int, optional
-        file mode of the newly written file
+        path to the file to be read from
     show_progress : bool
         show a progress spinner in the terminal
+    file_read_delayed: bool
+        If True, columns of dftype 'json', 'ndarray', 'Image' and 'SparseNdarray' are proxied for
+        reading later, returning cells are instances of :class:`Pdh5Cell` instead. If False, these
+        columns are read thoroughly, which can be slow.
+    max_rows : int, optional
+        limit the maximum number of rows to be read from the file
+    columns : list, optional
+        list of columns to be read from the file, in the given order. Only the HDF5 objects of
+        these columns are opened and decoded. If not provided, all columns are read.
+    rows : slice or numpy.ndarray or list, optional
+        rows to be read from the file. It can be a slice with positive step, a boolean mask over
+        all rows, or a strictly increasing array of row ids. Contiguous selections are read with
+        HDF5 hyperslab selections and sparse ones with point selections. If `max_rows` is also
+        provided, only the first `max_rows` selected rows are read. If not provided, all rows are
+        read.
+    io_mode : {'buffer', 'mmap', 'direct'}, optional
+        How the file is accessed. If 'buffer', the whole file is read into memory using
+        :func:`mt.aio.read_binary` and the HDF5 image is opened from the buffer, which suits
+        network filesystems. If 'mmap', the file is memory-mapped. If 'direct', the file is opened
+        by path and only the needed parts are read, which suits large files and selective reads.
+        If not provided, 'buffer' is used to load the whole file, and 'direct' is used when
+        `file_read_delayed` is True or when any of `max_rows`, `columns`, `rows` and `filters` is
+        provided.
+    n_threads : int, optional
+        number of threads to decode independent columns concurrently. This is best-effort, since
+        h5py serialises reading and decompressing. See :func:`load_pdh5_columns`. If not
+        provided or 1, the columns are decoded one after another. Ignored if `executor` is
+        provided.
+    executor : concurrent.futures.Executor, optional
+        an executor to decode independent columns concurrently, e.g. a thread pool shared by the
+        caller
+    str_as_category : bool
+        whether or not to load str columns as categorical columns. Dictionary-encoded str columns
+        are then loaded without decoding any string per row.
+    filters : list, optional
+        parquet-style filters in disjunctive normal form, i.e. a list of `(column, op, value)`
+        tuples that must all hold, or a list of such lists, at least one of which must hold. The
+        supported operators are '=', '==', '!=', '<', '<=', '>', '>=', 'in' and 'not in'. Null
+        values never match. Values compared against a Timestamp column are normalised by
+        :func:`normalise_timestamp`. Chunks of rows whose statistics cannot match are skipped, the
+        filtered columns are read for the remaining rows only and the other columns are read
+        for the matching rows only. The filters apply to the rows selected by `rows`, before
+        `max_rows` is applied.
+    context_vars : dict
+        a dictionary of context variables within which the function runs. It must include
+        `context_vars['async']` to tell whether to invoke the function asynchronously or not.
+        Only used in 'buffer' mode.
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        the loaded dataframe
     """
     if show_progress:
-        spinner = HaloAuto("dfsaving '{}'".format(filepath), spinner="dots")
+        spinner = HaloAuto("dfloading '{}'".format(filepath), spinner="dots")
         scope = spinner
     else:
         spinner = None
         scope = ctx.nullcontext()
     try:
-        import h5py
-
-        filepath2 = filepath + ".mttmp"
-        with scope, h5py.File(filepath2, "w") as f:
-            save_pdh5_index(f, df, spinner=spinner)
-            save_pdh5_columns(f, df, spinner=spinner)
-        if file_mode is not None:  # chmod
-            os.chmod(filepath2, file_mode)
-        path.rename(filepath2, filepath, overwrite=True)
+        if io_mode is None:
+            selective = filters or any(x is not None for x in (max_rows, columns, rows))
+            io_mode = "direct" if file_read_delayed or selective else "buffer"
+        if io_mode == "buffer":
+            data = await aio.read_binary(filepath, context_vars=context_vars)
+        else:
+            data = None
+        with scope, open_pdh5_file(filepath, io_mode=io_mode, data=data) as f:
+            if filters:
+                rows = get_filtered_rows(f, filters, rows=rows, spinner=spinner)
+            df = load_pdh5_index(f, spinner=spinner, max_rows=max_rows, rows=rows)
+            df = load_pdh5_columns(
+                f,
+                df,
+                spinner=spinner,
+                file_read_delayed=file_read_delayed,
+                max_rows=max_rows,
+                columns=columns,
+                rows=rows,
+                filepath=filepath,
+                n_threads=n_threads,
+                executor=executor,
+                str_as_category=str_as_category,
+            )
         if show_progress:
-            spinner.succeed("dfsaved '{}'".format(filepath))
+            spinner.succeed("dfloaded '{}'".format(filepath))
+        return df
     except:
         if show_progress:
-            spinner.fail("failed to dfsave '{}'".format(filepath))
+            spinner.fail("failed to load '{}'".format(filepath))
         raise
 
 
-def load_pdh5_index(f, spinner=None, max_rows: tp.Optional[int] = None) -> pd.DataFrame:
-    if f.attrs["format"] != "pdh5":
-        raise ValueError("Input file does not have 'pdh5' format.")
-    size = f.attrs["size"]
+def iter_pdh5_chunks(
+    f,
+    chunksize: int,
+    spinner=None,
+    file_read_delayed: bool = False,
+    max_rows: tp.Optional[int] = None,
+    columns: tp.Optional[tp.List[str]] = None,
+    filepath: tp.Optional[str] = None,
+    n_threads: tp.Optional[int] = None,
+    executor: tp.Optional[Executor] = None,
+    str_as_category: bool = False,
+) -> tp.Iterator[tp.Callable[[], pd.DataFrame]]:
+    """Yields, for each chunk of consecutive rows of an opened pdh5 file, a function loading it.
 
-    grp = f.require_group("index")
+    Each chunk is loaded with hyperslab selections only. See :func:`iter_pdh5` for the
+    arguments.
+    """
+    if chunksize < 1:
+        raise ValueError(
+            "Argument 'chunksize' must be positive. Got: {}.".format(chunksize)
+        )
+    size = int(f.attrs["size"])
+    if max_rows is not None:
+        size = min(size, max_rows)
 
-    index_type = grp.attrs["type"]
-    if spinner is not None:
-        spinner.text = "loading index of type {}".format(index_type)
+    for start in range(0, size, chunksize):
+        stop = min(start + chunksize, size)
 
-    if index_type == "RangeIndex":
-        start = grp.attrs.get("start", None)
-        stop = grp.attrs.get("stop", None)
-        step = grp.attrs.get("step", None)
-        if (
-            stop is not None
-            and start is not None
-            and step is not None
-            and max_rows is not None
-        ):
-            stop = start + step * max_rows
-        name = grp.attrs.get("name", None)
-        index = pd.RangeIndex(start=start, stop=stop, step=step, name=name)
-    elif index_type in ("Int64Index", "UInt64Index", "Float64Index", "Index"):
-        name = grp.attrs.get("name", None)
-        if max_rows is None:
-            values = grp["values"][:]
-        else:
-            values = grp["values"][:max_rows]
-        if index_type != "Index":
-            index = getattr(pd, index_type)(data=values, name=name)
-        else:
-            index = pd.Index(data=values, dtype=grp.attrs["dtype"], name=name)
-    else:
-        raise ValueError("Unsupported index type '{}'.".format(type(index)))
+        def load_chunk(rows=slice(start, stop)):
+            df = load_pdh5_index(f, spinner=spinner, rows=rows)
+            return load_pdh5_columns(
+                f,
+                df,
+                spinner=spinner,
+                file_read_delayed=file_read_delayed,
+                columns=columns,
+                rows=rows,
+                filepath=filepath,
+                n_threads=n_threads,
+                executor=executor,
+                str_as_category=str_as_category,
+            )
 
-    return pd.DataFrame(index=index)
+        yield load_chunk
 
 
-def load_pdh5_columns(
-    f,
-    df: pd.DataFrame,
-    spinner=None,
+def iter_pdh5(
+    filepath: str,
+    chunksize: int = 65536,
+    show_progress: bool = False,
     file_read_delayed: bool = False,
     max_rows: tp.Optional[int] = None,
-):
-    columns = json.loads(f.attrs["columns"])
-    size = len(df.index)
-    if max_rows is not None:
-        size = min(size, max_rows)
+    columns: tp.Optional[tp.List[str]] = None,
+    io_mode: str = "direct",
+    n_threads: tp.Optional[int] = None,
+    executor: tp.Optional[Executor] = None,
+    str_as_category: bool = False,
+    **kwargs
+) -> tp.Iterator[pd.DataFrame]:
+    """Iterates over a .pdh5 file, yielding dataframes of consecutive rows.
 
-    for column in columns:
-        if spinner is not None:
-            spinner.text = "loading column '{}'".format(column)
-        key = "column_" + text_filename(column)
-        dftype = columns[column]
-        if dftype == "none":
-            df[column] = None
-        elif dftype == "str":
-            df[column] = f[key][:size]
-            df[column] = df[column].apply(
-                lambda x: (
-                    None
-                    if x in (b"", b"None_NaT_NaN")
-                    else x.decode() if isinstance(x, bytes) else x
-                )
-            )
-        elif dftype in (
-            "bool",
-            "int8",
-            "uint8",
-            "int16",
-            "uint16",
-            "int32",
-            "uint32",
-            "float32",
-            "int64",
-            "uint64",
-            "float64",
-        ):
-            df[column] = f[key][:size]
-        elif dftype == "json":
-            if file_read_delayed:
-                col = Pdh5Column(f.filename, column)
-                df[column] = [Pdh5Cell(col, i) for i in range(size)]
-            else:
-                d = f[key]
-                df[column] = [
-                    None if d[i] == b"" else json.loads(d[i]) for i in range(size)
-                ]  # slower than loading everything to memory but requires less memory to process
-        elif dftype == "Timestamp":
-            df[column] = f[key][:size]
-            df[column] = df[column].apply(
-                lambda x: pd.NaT if x == b"" else pd.Timestamp(x.decode())
-            )
-        elif dftype == "Timedelta":
-            df[column] = f[key][:size]
-            df[column] = df[column].apply(
-                lambda x: pd.NaT if x == b"" else pd.Timedelta(x.decode())
-            )
-        elif dftype in ("ndarray", "Image", "SparseNdarray"):
-            data = [None] * size
-            grp = f.require_group(key)
-            if file_read_delayed:
-                col = Pdh5Column(f.filename, column)
-            for key in grp.keys():
-                i = int(key)
-                if i < size:
-                    data[i] = (
-                        Pdh5Cell(col, i)
-                        if file_read_delayed
-                        else load_special_cell(grp, key, dftype)
-                    )
-            df[column] = data
-        else:
-            raise ValueError(
-                "Unable to load column '{}' with dftype '{}'.".format(column, dftype)
-            )
+    The file is opened once and stays open until the iteration is over. Only one chunk is held
+    in memory at a time, so files larger than the memory can be processed.
+
+    Parameters
+    ----------
+    filepath : str
+        path to the file to be read from
+    chunksize : int
+        number of rows of each chunk. The last chunk may be shorter.
+    show_progress : bool
+        show a progress spinner in the terminal
+    file_read_delayed: bool
+        If True, columns of dftype 'json', 'ndarray', 'Image' and 'SparseNdarray' are proxied for
+        reading later. See :func:`load_pdh5_asyn`.
+    max_rows : int, optional
+        limit the maximum number of rows to be read from the file
+    columns : list, optional
+        list of columns to be read from the file, in the given order. If not provided, all
+        columns are read.
+    io_mode : {'direct', 'mmap'}
+        How the file is accessed. See :func:`load_pdh5_asyn`. Mode 'buffer' is not supported
+        because it would read the whole file into memory.
+    n_threads : int, optional
+        number of threads to decode independent columns of each chunk concurrently, best-effort.
+        See :func:`load_pdh5_columns`.
+    executor : concurrent.futures.Executor, optional
+        an executor to decode independent columns of each chunk concurrently
+    str_as_category : bool
+        whether or not to load str columns as categorical columns. The categories of
+        dictionary-encoded str columns are the same across chunks.
+
+    Returns
+    -------
+    Iterator[pandas.DataFrame]
+        an iterator of dataframes, each of which keeps the index of its rows in the file
+    """
+    if io_mode not in ("direct", "mmap"):
+        raise ValueError(
+            "Argument 'io_mode' must be 'direct' or 'mmap'. Got: '{}'.".format(io_mode)
+        )
+    if show_progress:
+        spinner = HaloAuto("dfiterating '{}'".format(filepath), spinner="dots")
+        scope = spinner
+    else:
+        spinner = None
+        scope = ctx.nullcontext()
+    try:
+        with scope, open_pdh5_file(filepath, io_mode=io_mode) as f:
+            for load_chunk in iter_pdh5_chunks(
+                f,
+                chunksize,
+                spinner=spinner,
+                file_read_delayed=file_read_delayed,
+                max_rows=max_rows,
+                columns=columns,
+                filepath=filepath,
+                n_threads=n_threads,
+                executor=executor,
+                str_as_category=str_as_category,
+            ):
+                yield load_chunk()
+        if show_progress:
+            spinner.succeed("dfiterated '{}'".format(filepath))
+    except:
+        if show_progress:
+            spinner.fail("failed to iterate '{}'".format(filepath))
+        raise
 
 
-async def load_pdh5_asyn(
+async def iter_pdh5_asyn(
     filepath: str,
+    chunksize: int = 65536,
     show_progress: bool = False,
     file_read_delayed: bool = False,
     max_rows: tp.Optional[int] = None,
+    columns: tp.Optional[tp.List[str]] = None,
+    io_mode: str = "direct",
+    n_threads: tp.Optional[int] = None,
+    executor: tp.Optional[Executor] = None,
+    str_as_category: bool = False,
     context_vars: dict = {},
     **kwargs
-) -> pd.DataFrame:
-    """Loads the dataframe of a .pdh5 file.
+) -> tp.AsyncIterator[pd.DataFrame]:
+    """An asyn iterator over a .pdh5 file, yielding dataframes of consecutive rows.
 
     Parameters
     ----------
     filepath : str
         path to the file to be read from
+    chunksize : int
+        number of rows of each chunk. The last chunk may be shorter.
     show_progress : bool
         show a progress spinner in the terminal
     file_read_delayed: bool
         If True, columns of dftype 'json', 'ndarray', 'Image' and 'SparseNdarray' are proxied for
-        reading later, returning cells are instances of :class:`Pdh5Cell` instead. If False, these
-        columns are read thoroughly, which can be slow.
+        reading later. See :func:`load_pdh5_asyn`.
     max_rows : int, optional
         limit the maximum number of rows to be read from the file
+    columns : list, optional
+        list of columns to be read from the file, in the given order. If not provided, all
+        columns are read.
+    io_mode : {'direct', 'mmap'}
+        How the file is accessed. See :func:`iter_pdh5`.
+    n_threads : int, optional
+        number of threads to decode independent columns of each chunk concurrently, best-effort.
+        See :func:`load_pdh5_columns`.
+    executor : concurrent.futures.Executor, optional
+        an executor to decode independent columns of each chunk concurrently
+    str_as_category : bool
+        whether or not to load str columns as categorical columns. The categories of
+        dictionary-encoded str columns are the same across chunks.
     context_vars : dict
         a dictionary of context variables within which the function runs. It must include
-        `context_vars['async']` to tell whether to invoke the function asynchronously or not.
-        Ignored for '.pdh5' format.
+        `context_vars['async']` to tell whether to invoke the function asynchronously or not. In
+        asynchronous mode, each chunk is loaded in a worker thread, leaving the event loop free.
 
     Returns
     -------
-    df : pandas.DataFrame
-        the loaded dataframe
+    AsyncIterator[pandas.DataFrame]
+        an asyn iterator of dataframes, each of which keeps the index of its rows in the file
     """
+    if io_mode not in ("direct", "mmap"):
+        raise ValueError(
+            "Argument 'io_mode' must be 'direct' or 'mmap'. Got: '{}'.".format(io_mode)
+        )
     if show_progress:
-        spinner = HaloAuto("dfloading '{}'".format(filepath), spinner="dots")
+        spinner = HaloAuto("dfiterating '{}'".format(filepath), spinner="dots")
         scope = spinner
     else:
         spinner = None
         scope = ctx.nullcontext()
     try:
-        import h5py
+        with scope, open_pdh5_file(filepath, io_mode=io_mode) as f:
+            for load_chunk in iter_pdh5_chunks(
+                f,
+                chunksize,
+                spinner=spinner,
+                file_read_delayed=file_read_delayed,
+                max_rows=max_rows,
+                columns=columns,
+                filepath=filepath,
+                n_threads=n_threads,
+                executor=executor,
+                str_as_category=str_as_category,
+            ):
+                if context_vars.get("async", False):
+                    import asyncio
 
-        if file_read_delayed:
-            my_file = filepath
-        else:
-            data = await aio.read_binary(filepath, context_vars=context_vars)
-            my_file = BytesIO(data)
-        with scope, h5py.File(filepath, "r") as f:
-            df = load_pdh5_index(f, spinner=spinner, max_rows=max_rows)
-            with warnings.catch_warnings(record=True) as l_msgs:
-                load_pdh5_columns(
-                    f,
-                    df,
-                    spinner=spinner,
-                    file_read_delayed=file_read_delayed,
-                    max_rows=max_rows,
-                )
-            if l_msgs:
-                to_copy = False
-                for msg in l_msgs:
-                    if issubclass(msg.category, pd.errors.PerformanceWarning):
-                        to_copy = True
-                    else:
-                        warnings.warn(msg)
-
-                if to_copy:
-                    if show_progress:
-                        spinner.text = "defragmenting the dataframe"
-                    df = df.copy()
+                    loop = asyncio.get_event_loop()
+                    yield await loop.run_in_executor(None, load_chunk)
+                else:
+                    yield load_chunk()
         if show_progress:
-            spinner.succeed("dfloaded '{}'".format(filepath))
-        return df
+            spinner.succeed("dfiterated '{}'".format(filepath))
     except:
         if show_progress:
-            spinner.fail("failed to load '{}'".format(filepath))
+            spinner.fail("failed to iterate '{}'".format(filepath))
         raise
+
+
+class Pdh5Frame:
+    """A lazy, read-only dataframe view of a pdh5 file.
+
+    Columns are read and decoded only when they are first accessed, and then kept in the frame.
+    Rows can be selected before anything is read, yielding another lazy frame. The file is
+    accessed through the process-wide :data:`pdh5_file_pool`.
+
+    Parameters
+    ----------
+    filepath : str
+        path to the pdh5 file
+    rows : slice or numpy.ndarray or list, optional
+        rows of the file to be viewed. See :func:`get_row_selection`. If not provided, all rows
+        are viewed.
+    file_read_delayed : bool
+        If True, columns of dftype 'json', 'ndarray', 'Image' and 'SparseNdarray' are proxied for
+        reading later. See :func:`load_pdh5_asyn`.
+    str_as_category : bool
+        whether or not to load str columns as categorical columns
+
+    Examples
+    --------
+    >>> frame = open_pdh5('data.pdh5')
+    >>> frame.columns, len(frame)
+    >>> s = frame['label']  # only column 'label' is read
+    >>> df = frame[1000:2000].to_pandas(columns=['label', 'score'])
+    >>> m = frame.get_csr('bow')  # a column of sparse vectors as a scipy CSR matrix
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        rows=None,
+        file_read_delayed: bool = False,
+        str_as_category: bool = False,
+    ):
+        self.filepath = filepath
+        self.file_read_delayed = file_read_delayed
+        self.str_as_category = str_as_category
+        with pdh5_file_pool.borrow(filepath) as f:
+            if f.attrs.get("format", None) != "pdh5":
+                raise ValueError("Input file does not have 'pdh5' format.")
+            self.size = int(f.attrs["size"])
+            self.dftypes = json.loads(f.attrs["columns"])
+        self.sel = get_row_selection(self.size, rows=rows)
+        self.series = {}  # materialised columns
+        self.loaded_index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(get_row_ids(self.sel))
+
+    def __repr__(self):
+        return "Pdh5Frame('{}', {} rows, columns={})".format(
+            self.filepath, len(self), self.columns
+        )
+
+    def __contains__(self, column):
+        return column in self.dftypes
+
+    @property
+    def columns(self) -> tp.List[str]:
+        """the list of columns"""
+        return list(self.dftypes)
+
+    @property
+    def shape(self) -> tuple:
+        """the number of rows and the number of columns"""
+        return (len(self), len(self.dftypes))
+
+    @property
+    def index(self) -> pd.Index:
+        """the index of the viewed rows, read on first access"""
+        if self.loaded_index is None:
+            with pdh5_file_pool.borrow(self.filepath) as f:
+                self.loaded_index = load_pdh5_index(f, rows=self.sel).index
+        return self.loaded_index
+
+    def close(self):
+        """Releases the pooled file handle shared by the columns of the file.
+
+        Threads still reading through the handle keep it open until they are done. See
+        :meth:`Pdh5FilePool.close`.
+        """
+        pdh5_file_pool.close(self.filepath)
+
+    def get_column(self, column: str) -> pd.Series:
+        """Returns a column, reading and decoding it on first access."""
+        if column not in self.dftypes:
+            raise KeyError(column)
+        s = self.series.get(column, None)
+        if s is None:
+            with pdh5_file_pool.borrow(self.filepath) as f:
+                s = load_pdh5_column(
+                    f,
+                    column,
+                    self.dftypes[column],
+                    self.sel,
+                    file_read_delayed=self.file_read_delayed,
+                    filepath=self.filepath,
+                    str_as_category=self.str_as_category,
+                )
+            s.index = self.index
+            self.series[column] = s
+        return s
+
+    def get_csr(self, column: str):
+        """Returns a SparseNdarray column of sparse vectors as a CSR matrix, one row per viewed row.
+
+        The values and indices of the column are read in bulk, without building any cell. Null
+        cells become empty rows. The column must be stored in the 'coo' layout. Invoking the
+        method requires importing scipy.
+
+        Returns
+        -------
+        scipy.sparse.csr_array
+            the CSR matrix. Its number of columns is the largest dense shape of the cells.
+        """
+        if column not in self.dftypes:
+            raise KeyError(column)
+        if self.dftypes[column] != "SparseNdarray":
+            raise ValueError(
+                "Column '{}' has dftype '{}', not 'SparseNdarray'.".format(
+                    column, self.dftypes[column]
+                )
+            )
+        with pdh5_file_pool.borrow(self.filepath) as f:
+            grp = f["column_" + text_filename(column)]
+            if grp.attrs.get("layout", "rows") != "coo":
+                raise ValueError(
+                    "Column '{}' is not stored in the 'coo' layout. Please re-save the file "
+                    "with save_pdh5() first.".format(column)
+                )
+            data, indices, indptr, shape = load_sparse_csr(grp, self.sel)
+
+        import scipy.sparse as ss
+
+        return ss.csr_array((data, indices, indptr), shape=shape)
+
+    def take(self, rows) -> "Pdh5Frame":
+        """Selects rows, relative to the viewed rows, without reading anything.
+
+        Parameters
+        ----------
+        rows : slice or numpy.ndarray or list
+            rows to be selected. See :func:`get_row_selection`.
+
+        Returns
+        -------
+        Pdh5Frame
+            a lazy frame viewing the selected rows
+        """
+        sub_sel = get_row_selection(len(self), rows=rows)
+        if isinstance(self.sel, slice) and isinstance(sub_sel, slice):
+            start = self.sel.start
+            rows = slice(start + sub_sel.start, start + sub_sel.stop)
+        else:
+            rows = np.asarray(get_row_ids(self.sel), dtype=np.int64)[sub_sel]
+        return Pdh5Frame(
+            self.filepath,
+            rows=rows,
+            file_read_delayed=self.file_read_delayed,
+            str_as_category=self.str_as_category,
+        )
+
+    def __getitem__(self, key):
+        """Returns a column if `key` is a column, a dataframe if `key` is a list of columns, or a
+        lazy frame of selected rows if `key` is a slice, a boolean mask or an array of row ids.
+        """
+        if isinstance(key, str):
+            return self.get_column(key)
+        if isinstance(key, list) and all(isinstance(x, str) for x in key):
+            return self.to_pandas(columns=key)
+        return self.take(key)
+
+    def to_pandas(self, columns: tp.Optional[tp.List[str]] = None) -> pd.DataFrame:
+        """Materialises the frame, or some of its columns, into a dataframe.
+
+        Parameters
+        ----------
+        columns : list, optional
+            list of columns to be materialised, in the given order. If not provided, all columns
+            are materialised.
+
+        Returns
+        -------
+        pandas.DataFrame
+            the materialised dataframe
+        """
+        if columns is None:
+            columns = self.columns
+        missing_columns = [x for x in columns if x not in self.dftypes]
+        if missing_columns:
+            raise ValueError(
+                "Columns {} do not exist in the pdh5 file.".format(missing_columns)
+            )
+        l_series = [
+            self.get_column(x).set_axis(pd.RangeIndex(len(self))) for x in columns
+        ]
+        df = pd.DataFrame(
+            dict(zip(columns, l_series)),
+            index=pd.RangeIndex(len(self)),
+            columns=list(columns),
+        )
+        df.index = self.index
+        return df
+
+
+def open_pdh5(
+    filepath: str,
+    file_read_delayed: bool = False,
+    str_as_category: bool = False,
+) -> Pdh5Frame:
+    """Opens a .pdh5 file as a lazy dataframe, reading columns only when they are accessed.
+
+    Parameters
+    ----------
+    filepath : str
+        path to the file to be read from
+    file_read_delayed : bool
+        If True, columns of dftype 'json', 'ndarray', 'Image' and 'SparseNdarray' are proxied for
+        reading later. See :func:`load_pdh5_asyn`.
+    str_as_category : bool
+        whether or not to load str columns as categorical columns
+
+    Returns
+    -------
+    Pdh5Frame
+        the lazy frame of all rows of the file
+    """
+    return Pdh5Frame(
+        filepath, file_read_delayed=file_read_delayed, str_as_category=str_as_category
+    )
+
+
+def verify_pdh5(
+    filepath: str,
+    columns: tp.Optional[tp.List[str]] = None,
+    n_threads: tp.Optional[int] = None,
+) -> dict:
+    """Checks the columns of a .pdh5 file against their checksums.
+
+    The stored, possibly compressed, bytes of each column are read and hashed without decoding
+    them, except for variable-length data like strings, whose elements are read through HDF5.
+    See :func:`save_pdh5`.
+
+    Parameters
+    ----------
+    filepath : str
+        local path to the file
+    columns : list, optional
+        list of columns to be checked. If not provided, all columns are checked.
+    n_threads : int, optional
+        number of threads to check columns concurrently. Where :func:`os.pread` is available,
+        the stored chunks of fixed-size data are read outside of HDF5, so that the threads read
+        and hash concurrently. Variable-length data is read through HDF5, one thread at a time.
+        If not provided or 1, columns are checked one after another.
+
+    Returns
+    -------
+    dict
+        a dictionary mapping each checked column that failed to the reason why. Columns without
+        a recorded checksum fail too. An empty dictionary means that all checked columns are
+        intact.
+
+    Raises
+    ------
+    OSError
+        if the file cannot be opened, e.g. if it is truncated, which HDF5 detects when opening
+        the file
+    """
+    with open_pdh5_file(filepath) as f:
+        if f.attrs.get("format", None) != "pdh5":
+            raise ValueError("Input file does not have 'pdh5' format.")
+        all_columns = json.loads(f.attrs["columns"])
+        if columns is None:
+            columns = list(all_columns)
+        else:
+            missing_columns = [x for x in columns if x not in all_columns]
+            if missing_columns:
+                raise ValueError(
+                    "Columns {} do not exist in the pdh5 file.".format(missing_columns)
+                )
+
+        fd = os.open(filepath, os.O_RDONLY) if hasattr(os, "pread") else None
+
+        def verify_column(column):
+            if all_columns[column] == "none":  # nothing stored
+                return None
+            try:
+                obj = f["column_" + text_filename(column)]
+                expected = obj.attrs.get("checksum", None)
+                if expected is None:
+                    return "no checksum recorded"
+                algorithm = expected.split(":")[0]
+                datasets = list_pdh5_datasets(obj)
+                digests = [
+                    compute_dataset_digests(ds, algorithm, fd=fd) for ds in datasets
+                ]
+                actual = combine_pdh5_digests(datasets, digests, algorithm)
+            except (OSError, RuntimeError, KeyError, ValueError) as e:
+                return "unable to read the column: {}".format(e)
+            if actual != expected:
+                return "mismatched checksum: recorded '{}', computed '{}'".format(
+                    expected, actual
+                )
+            return None
+
+        try:
+            if n_threads is not None and n_threads > 1:
+                with ThreadPoolExecutor(max_workers=n_threads) as executor:
+                    results = list(executor.map(verify_column, columns))
+            else:
+                results = [verify_column(column) for column in columns]
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    return {x: y for x, y in zip(columns, results) if y is not None}